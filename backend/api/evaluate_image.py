@@ -1,36 +1,33 @@
-import os
 import json
 import uuid
-import re
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, field_validator
-from openai import OpenAI
-from config import OPENAI_API_KEY, BRIEF_PROMPT_PATH
-from utils import init_pinecone, get_relevant_brief
-import torch
+from readiness import require_ready
+from submission_writer import submission_writer
+from result_cache import make_result_key
+from streaming import evaluation_events, final_result, sse_response
+from jobs import JobAccepted, job_runner, submit_job
+from utils import find_image_brief
+from prompts import prompt_registry, TEMPLATES
+from question_selector import question_selector
+from executors import run_io, run_cpu
+from clip_encoder import decode_board, preprocess, pool_views
+from clip_batcher import clip_batcher
+from config import CLIP_INDEX_TILES, SCREENSHOT_QUALITY
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
-from playwright.async_api import async_playwright
-import tempfile
+from browser_pool import browser_pool
+from screenshot_cache import screenshot_cache
+import hashlib
+import io
 import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 router = APIRouter()
 
-# Initialize CLIP model and processor globally
-try:
-    print("Initializing CLIP model and processor...")
-    clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-    clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-    print("CLIP model initialized successfully")
-except Exception as e:
-    print(f"Error initializing CLIP model: {e}")
-    raise RuntimeError(f"Failed to initialize CLIP model: {e}")
-
 
 class ImageSubmission(BaseModel):
     image_url: str
+    # Recapture the board even if a recent screenshot is cached
+    force_refresh: bool = False
 
     @field_validator("image_url")
     @classmethod
@@ -44,36 +41,53 @@ class EvaluationResponse(BaseModel):
     evaluation: dict
 
 
-async def screenshot_milanote_board(board_url: str) -> str:
-    """Take a screenshot of a Milanote board and return the path to the temporary file."""
+async def capture_board(board_url: str) -> bytes:
+    """Render a Milanote board with the shared browser pool and return JPEG bytes."""
+    # Pages come from the shared browser pool, see browser_pool.BrowserPool
+    async with browser_pool.page() as page:
+        await page.goto(board_url, wait_until="networkidle", timeout=60000)
+        return await page.screenshot(
+            full_page=True, type="jpeg", quality=SCREENSHOT_QUALITY
+        )
+
+
+async def screenshot_milanote_board(
+    board_url: str, force_refresh: bool = False
+) -> tuple[bytes, str, bool]:
+    """Screenshot a Milanote board, keeping the image in memory.
+
+    A screenshot of the same URL taken within SCREENSHOT_CACHE_TTL is reused
+    without opening a page, unless `force_refresh` is set.
+
+    Returns:
+        The encoded image, its SHA-256 and whether it came from the cache
+    """
+    cached = None if force_refresh else await run_io(screenshot_cache.get, board_url)
+    if cached is not None:
+        print(f"Using cached screenshot of: {board_url}")
+        return cached["image"], cached["digest"], True
+
     print(f"Capturing screenshot from: {board_url}")
-    temp_file = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            # Set viewport size to ensure consistent capture
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-            await page.goto(board_url, wait_until="networkidle", timeout=60000)
-            await page.screenshot(path=temp_file.name, full_page=True)
-            await browser.close()
-        print(f"Screenshot saved to: {temp_file.name}")
-        return temp_file.name
+        image = await capture_board(board_url)
     except Exception as e:
-        if os.path.exists(temp_file.name):
-            os.unlink(temp_file.name)
         print(f"Screenshot error: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Failed to capture screenshot: {str(e)}"
         )
+    digest = hashlib.sha256(image).hexdigest()
+    await run_io(screenshot_cache.put, board_url, image, "jpeg", digest)
+    print(f"Screenshot captured ({len(image)} bytes)")
+    return image, digest, False
 
 
-def validate_image(image_path: str) -> None:
-    """Validate image size and format."""
+def validate_image(data: bytes) -> None:
+    """Validate image size and format from the image header alone."""
     try:
-        with Image.open(image_path) as img:
+        # Image.open only parses the header; pixels are decoded later
+        with Image.open(io.BytesIO(data)) as img:
             # Check format
-            if img.format not in ["PNG", "JPEG", "JPG"]:
+            if img.format not in ["PNG", "JPEG", "JPG", "WEBP"]:
                 raise ValueError(f"Unsupported image format: {img.format}")
 
             # Check dimensions
@@ -83,37 +97,49 @@ def validate_image(image_path: str) -> None:
             if width > 10000 or height > 10000:
                 raise ValueError(f"Image too large: {width}x{height}")
 
-            # Check file size
-            file_size = os.path.getsize(image_path) / (1024 * 1024)  # Size in MB
-            if file_size > 50:
-                raise ValueError(f"File too large: {file_size:.1f}MB")
+        # Check file size
+        file_size = len(data) / (1024 * 1024)  # Size in MB
+        if file_size > 50:
+            raise ValueError(f"File too large: {file_size:.1f}MB")
     except Exception as e:
         raise ValueError(f"Image validation failed: {str(e)}")
 
 
-def get_image_embedding(image_path: str) -> list[float]:
-    """Get CLIP embedding for an image."""
+def pad_vector(vector: list[float], dimension: int = 1536) -> list[float]:
+    """Pad or truncate a CLIP vector to the Pinecone dimension (1536) for upserts."""
+    if len(vector) < dimension:
+        return vector + [0.0] * (dimension - len(vector))
+    return vector[:dimension]
+
+
+def prepare_image(data: bytes):
+    """Validate a screenshot and turn its views into CLIP pixel_values."""
+    # Validate image before processing
+    validate_image(data)
+    views, boxes = decode_board(data)
+    return preprocess(views), boxes
+
+
+async def get_image_embedding(data: bytes) -> dict:
+    """Get the CLIP embedding of a board screenshot and of its tiles.
+
+    Decoding and preprocessing run on the CPU pool; the forward pass is
+    batched with other concurrent requests, see clip_batcher.ClipBatcher.
+
+    Returns:
+        {"vector": 512-d board vector, "tiles": [{"box", "vector"}, ...]}
+    """
     print("Generating image embedding...")
     try:
-        # Validate image before processing
-        validate_image(image_path)
-
-        image = Image.open(image_path).convert("RGB")
-        inputs = clip_processor(images=image, return_tensors="pt")
-
-        with torch.no_grad():
-            image_features = clip_model.get_image_features(**inputs)
-        embedding = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
-        vector = embedding[0].tolist()
-
-        # Pad to Pinecone dimension (1536)
-        vector = (
-            vector + [0.0] * (1536 - len(vector))
-            if len(vector) < 1536
-            else vector[:1536]
+        pixel_values, boxes = await run_cpu(prepare_image, data)
+        vectors = await clip_batcher.encode_async(pixel_values)
+        embedding = pool_views(vectors, boxes)
+
+        print(
+            f"Image embedding generated successfully "
+            f"({len(embedding['tiles'])} tiles)"
         )
-        print("Image embedding generated successfully")
-        return vector
+        return embedding
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -122,251 +148,140 @@ def get_image_embedding(image_path: str) -> list[float]:
         )
 
 
-@router.post("/", response_model=EvaluationResponse)
-async def evaluate_image_submission(submission: ImageSubmission):
-    """Evaluate an image submission from a Milanote board.
+async def image_evaluation_events(submission: ImageSubmission, stream: bool = False):
+    """Evaluation pipeline for a Milanote board submission, as (event, data) pairs.
 
     Args:
         submission: ImageSubmission object containing the Milanote board URL
-
-    Returns:
-        EvaluationResponse containing the evaluation results
+        stream: Stream the GPT-4 completion question by question
 
     Raises:
         HTTPException: If any step in the evaluation process fails
     """
-    temp_image_path = None
     try:
         print(f"Starting evaluation for submission: {submission.image_url}")
 
         # Take screenshot of Milanote board
         try:
-            temp_image_path = await screenshot_milanote_board(submission.image_url)
-            print(f"Successfully captured screenshot: {temp_image_path}")
+            screenshot, screenshot_digest, cached = await screenshot_milanote_board(
+                submission.image_url, submission.force_refresh
+            )
+            print("Successfully captured screenshot")
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to capture Milanote board: {str(e)}"
             )
+        yield "screenshot_captured", {
+            "image_url": submission.image_url,
+            "cached": cached,
+        }
 
+        # Get image embedding
         try:
-            # Initialize Pinecone
-            index = init_pinecone()
-            print("Successfully initialized Pinecone index")
-
-            # Get image embedding
-            try:
-                image_embedding = get_image_embedding(temp_image_path)
-                print("Successfully generated image embedding")
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to generate image embedding: {str(e)}",
-                )
-
-            # Generate unique ID for the submission
-            image_id = f"image_{uuid.uuid4().hex}"
-            print(f"Generated submission ID: {image_id}")
-
-            try:
-                # Upsert to Pinecone with timestamp and metadata
-                timestamp = datetime.datetime.now(datetime.UTC)
-                index.upsert(
-                    namespace="image-submission",
-                    vectors=[
-                        {
-                            "id": image_id,
-                            "values": image_embedding,
-                            "metadata": {
-                                "source": submission.image_url,
-                                "type": "milanote_board",
-                                "timestamp": str(timestamp),
-                                "submission_type": "image",
-                            },
-                        }
-                    ],
-                )
-                print(f"Successfully upserted image submission: {image_id}")
-
-                # Verify upsert by checking stats
-                stats = index.describe_index_stats()
-                print(f"Index stats after upsert: {stats}")
-
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to upsert image submission: {str(e)}",
-                )
-
-            try:
-                # Get relevant brief
-                most_relevant_brief = get_relevant_brief(index, image_embedding)
-                if not most_relevant_brief:
-                    raise HTTPException(
-                        status_code=404,
-                        detail="No matching brief found for the submission",
-                    )
-                print("Successfully retrieved relevant brief")
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to retrieve relevant brief: {str(e)}",
-                )
-
-            # Load and validate prompt questions
-            try:
-                prompt_path = Path(BRIEF_PROMPT_PATH)
-                if not prompt_path.exists():
-                    raise HTTPException(
-                        status_code=404, detail="Prompt questions file not found"
-                    )
-
-                prompt_data = json.loads(prompt_path.read_text(encoding="utf-8"))
-                prompts = (
-                    prompt_data
-                    if isinstance(prompt_data, list)
-                    else prompt_data.get("prompts", [])
-                )
+            # CLIP inference runs off the event loop, batched across requests
+            embedding = await get_image_embedding(screenshot)
+            image_embedding = embedding["vector"]
+            print("Successfully generated image embedding")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to generate image embedding: {str(e)}",
+            )
 
-                if not prompts:
-                    raise HTTPException(
-                        status_code=500, detail="No evaluation prompts found"
-                    )
-                print("Successfully loaded prompt questions")
-            except json.JSONDecodeError:
-                raise HTTPException(
-                    status_code=500, detail="Failed to parse prompt questions file"
+        # Generate unique ID for the submission
+        image_id = f"image_{uuid.uuid4().hex}"
+        print(f"Generated submission ID: {image_id}")
+
+        # Queue for a batched background upsert with timestamp and metadata
+        timestamp = datetime.datetime.now(datetime.UTC)
+        submission_writer.enqueue(
+            "image-submission",
+            {
+                "id": image_id,
+                "values": pad_vector(image_embedding),
+                "metadata": {
+                    "source": submission.image_url,
+                    "type": "milanote_board",
+                    "timestamp": str(timestamp),
+                    "submission_type": "image",
+                },
+            },
+        )
+        if CLIP_INDEX_TILES:
+            # Tile vectors let later searches match a region of a large board
+            for i, tile in enumerate(embedding["tiles"]):
+                submission_writer.enqueue(
+                    "image-submission",
+                    {
+                        "id": f"{image_id}_tile_{i}",
+                        "values": pad_vector(tile["vector"]),
+                        "metadata": {
+                            "source": submission.image_url,
+                            "type": "milanote_board_tile",
+                            "parent_id": image_id,
+                            "tile_box": ",".join(map(str, tile["box"])),
+                            "timestamp": str(timestamp),
+                            "submission_type": "image",
+                        },
+                    },
                 )
+        print(f"Queued image submission for upsert: {image_id}")
 
-            # Filter relevant prompts
-            submission_type = "image"
-            relevant_prompts = [
-                p
-                for p in prompts
-                if p.get("type") in [submission_type, "general", "image"]
-            ]
-            if not relevant_prompts:
+        try:
+            # Match in CLIP space against the brief summaries, not Pinecone
+            brief = await find_image_brief(image_embedding)
+            most_relevant_brief = brief["text"]
+            if not most_relevant_brief:
                 raise HTTPException(
-                    status_code=500,
-                    detail="No relevant prompts found for image submission",
+                    status_code=404,
+                    detail="No matching brief found for the submission",
                 )
-
-            selected_prompts = relevant_prompts[:3]
-            print(f"Selected {len(selected_prompts)} relevant prompts")
-
-            prompt_blocks = "\n".join(
-                [
-                    f"{i+1}. {p['question']}\n- Corrections:\n- What went well:"
-                    for i, p in enumerate(selected_prompts)
-                ]
+            print("Successfully retrieved relevant brief")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to retrieve relevant brief: {str(e)}",
             )
-
-            # Create evaluation prompt
-            combined_prompt = (
-                "You are a brand evaluating influencer image-based submissions.\n"
-                "Given:\n"
-                "1. A campaign brief\n"
-                "2. A submission (Milanote board screenshot)\n"
-                "3. A list of evaluation questions\n\n"
-                "Evaluate internally using all relevant questions but output only the top 3 most relevant questions.\n"
-                "For each selected question:\n"
-                "- Provide bullet points for 'corrections' (if any), or write 'No corrections needed'\n"
-                "- Provide bullet points for 'what went well'\n\n"
-                "At the end, include a final summary with:\n"
-                "- Top-level corrections\n"
-                "- What the influencer did well\n"
-                "- A decision: 'ACCEPT' or 'REJECT' (must be one)\n\n"
-                "Respond in this JSON format:\n"
-                '{\n  "questions": [\n    {"question": "...", "corrections": "...", "what_went_well": "..."},\n    ...\n  ],\n  "summary": {\n    "corrections": "...",\n    "what_went_well": "...",\n    "decision": "ACCEPT" or "REJECT"\n  }\n}\n\n'
-                f"Brief:\n{most_relevant_brief}\n\n"
-                f"Submission URL:\n{submission.image_url}\n\n"
-                f"Questions:\n{prompt_blocks}\n"
+        yield "brief_matched", {
+            "brief_id": brief["id"],
+            "score": brief.get("score"),
+        }
+
+        # Compiled prompt set, hot-reloaded when the questions file changes
+        prompt_set = prompt_registry.get()
+        template = TEMPLATES["image"]
+        # CLIP vectors are not in the question embedding space; rank by brief only
+        questions = await question_selector.select(prompt_set, "image", brief)
+        yield "questions_selected", {"questions": [q["question"] for q in questions]}
+
+        async def build_prompt() -> str:
+            return prompt_set.render(
+                "image", most_relevant_brief, submission.image_url, questions
             )
 
-            print("Getting evaluation from GPT-4...")
-            try:
-                # Get evaluation from GPT-4
-                client = OpenAI(api_key=OPENAI_API_KEY)
-                response = client.chat.completions.create(
-                    model="gpt-4-turbo-preview",  # Using the latest model
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an AI that evaluates influencer image-based submissions. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
-                        },
-                        {"role": "user", "content": combined_prompt},
-                    ],
-                    temperature=0.2,  # Lower temperature for more consistent JSON formatting
-                    max_tokens=2000,
-                    response_format={"type": "json_object"},  # Enforce JSON response
-                )
-
-                # Debug: Print raw response content
-                raw_content = response.choices[0].message.content
-                print("Raw GPT-4 response:")
-                print(raw_content)
-
-                if not raw_content or raw_content.isspace():
-                    raise HTTPException(
-                        status_code=500, detail="Received empty response from GPT-4"
-                    )
-
-                try:
-                    evaluation = json.loads(raw_content)
-
-                    # Validate response structure
-                    required_keys = {"questions", "summary"}
-                    if not all(key in evaluation for key in required_keys):
-                        raise ValueError(
-                            "Response missing required keys: questions and/or summary"
-                        )
-
-                    if not isinstance(evaluation["questions"], list):
-                        raise ValueError("'questions' must be a list")
-
-                    if not isinstance(evaluation["summary"], dict):
-                        raise ValueError("'summary' must be an object")
-
-                    required_summary_keys = {
-                        "corrections",
-                        "what_went_well",
-                        "decision",
-                    }
-                    if not all(
-                        key in evaluation["summary"] for key in required_summary_keys
-                    ):
-                        raise ValueError("Summary missing required keys")
-
-                    print("Successfully validated JSON response structure")
-                    return EvaluationResponse(evaluation=evaluation)
-
-                except json.JSONDecodeError as je:
-                    print(f"JSON parse error at position {je.pos}: {je.msg}")
-                    print(
-                        f"Content around error: {raw_content[max(0, je.pos-50):je.pos+50]}"
-                    )
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Failed to parse GPT-4 response as JSON. Error: {str(je)}",
-                    )
-                except ValueError as ve:
-                    raise HTTPException(
-                        status_code=500, detail=f"Invalid response structure: {str(ve)}"
-                    )
-
-            except Exception as e:
-                print(f"Error generating evaluation: {str(e)}")
-                raise HTTPException(
-                    status_code=500, detail=f"Failed to generate evaluation: {str(e)}"
-                )
+        print("Getting evaluation from GPT-4...")
+        try:
+            # Identical submissions share one GPT-4 call and its cached result;
+            # keyed by the screenshot too, so an edited board is re-evaluated
+            cache_key = make_result_key(
+                "image",
+                f"{submission.image_url}#{screenshot_digest}",
+                brief["id"],
+                prompt_set.version,
+                template.model,
+            )
+            async for event in evaluation_events(
+                cache_key, template, build_prompt, stream
+            ):
+                yield event
 
-        finally:
-            # Clean up temporary file
-            if temp_image_path and os.path.exists(temp_image_path):
-                try:
-                    os.unlink(temp_image_path)
-                    print(f"Cleaned up temporary file: {temp_image_path}")
-                except Exception as e:
-                    print(f"Warning: Failed to clean up temporary file: {e}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error generating evaluation: {str(e)}")
+            raise HTTPException(
+                status_code=500, detail=f"Failed to generate evaluation: {str(e)}"
+            )
 
     except json.JSONDecodeError:
         raise HTTPException(
@@ -378,3 +293,50 @@ async def evaluate_image_submission(submission: ImageSubmission):
         raise HTTPException(
             status_code=500, detail=f"Unexpected error during evaluation: {str(e)}"
         )
+
+
+@router.post(
+    "/",
+    response_model=EvaluationResponse,
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def evaluate_image_submission(submission: ImageSubmission):
+    """Evaluate an image submission from a Milanote board.
+
+    Args:
+        submission: ImageSubmission object containing the Milanote board URL
+
+    Returns:
+        EvaluationResponse containing the evaluation results
+
+    Raises:
+        HTTPException: If any step in the evaluation process fails
+    """
+    evaluation = await final_result(image_evaluation_events(submission))
+    return EvaluationResponse(evaluation=evaluation)
+
+
+@router.post(
+    "/stream",
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def stream_image_submission(submission: ImageSubmission):
+    """Evaluate an image submission, streaming progress as server-sent events."""
+    return await sse_response(image_evaluation_events(submission, stream=True))
+
+
+async def run_image_job(payload: dict) -> dict:
+    return await final_result(image_evaluation_events(ImageSubmission(**payload)))
+
+
+job_runner.register("image", run_image_job)
+
+
+@router.post("/jobs", response_model=JobAccepted, status_code=202)
+async def submit_image_job(submission: ImageSubmission):
+    """Queue a image evaluation and return at once; poll /jobs/{job_id} for the result.
+
+    Jobs are accepted while the system is still initializing and run once
+    it is ready.
+    """
+    return await submit_job("image", submission.model_dump())
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from openai import OpenAI
-from config import OPENAI_API_KEY, BRIEF_PROMPT_PATH
-from utils import init_pinecone, get_embedding, get_relevant_brief
-import json
-from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from readiness import require_ready
+from submission_writer import submission_writer
+from result_cache import make_result_key
+from streaming import evaluation_events, final_result, sse_response
+from utils import find_relevant_brief
+from long_text import embed_long_text, embed_long_texts, fit_prompt_budget
+from batch import BatchEvaluationResponse, batch_response, evaluate_embedded
+from executors import run_io
+from config import BATCH_MAX_ITEMS
+from payload_store import payload_store
+from prompts import prompt_registry, TEMPLATES
+from question_selector import question_selector
 import uuid
 
 router = APIRouter()
@@ -14,170 +21,124 @@ class TextSubmission(BaseModel):
     text: str
 
 
+class TextBatchSubmission(BaseModel):
+    submissions: list[TextSubmission] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
 class EvaluationResponse(BaseModel):
     evaluation: dict
 
 
-@router.post("/", response_model=EvaluationResponse)
-async def evaluate_text_submission(submission: TextSubmission):
+async def text_evaluation_events(submission: TextSubmission, stream: bool = False):
+    """Evaluation pipeline for a text submission, as (event, data) pairs."""
     try:
-        # Initialize Pinecone
-        index = init_pinecone()
-
-        # Get embedding for submission text
-        submission_embedding = get_embedding(submission.text)
+        # Get embedding for submission text (chunked and pooled if long)
+        submission_embedding = await embed_long_text(submission.text)
 
         # Generate unique ID for submission
         submission_id = f"text_{uuid.uuid4().hex}"
-        print(f"Upserting text submission with ID: {submission_id}")
-
-        try:
-            # Upsert submission to Pinecone
-            index.upsert(
-                namespace="text-submission",
-                vectors=[
-                    {
-                        "id": submission_id,
-                        "values": submission_embedding,
-                        "metadata": {
-                            "chunk_text": submission.text,
-                            "source": "submission",
-                        },
-                    }
-                ],
-            )
-            print(f"Successfully upserted text submission: {submission_id}")
-
-            # Verify upsert by checking stats
-            stats = index.describe_index_stats()
-            print(f"Index stats after upsert: {stats}")
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to upsert text submission: {str(e)}"
-            )
 
-        # Get relevant brief
-        most_relevant_brief = get_relevant_brief(index, submission_embedding)
-
-        # Load prompt questions
-        prompt_path = Path(BRIEF_PROMPT_PATH)
-        if not prompt_path.exists():
-            raise HTTPException(
-                status_code=404, detail="Prompt questions file not found"
-            )
-
-        prompt_data = json.loads(prompt_path.read_text(encoding="utf-8"))
-        prompts = (
-            prompt_data
-            if isinstance(prompt_data, list)
-            else prompt_data.get("prompts", [])
+        # Queue submission for a batched background upsert; the text itself
+        # goes to the payload store and metadata only references its hash
+        payload_hash = await run_io(payload_store.put, submission.text)
+        submission_writer.enqueue(
+            "text-submission",
+            {
+                "id": submission_id,
+                "values": submission_embedding,
+                "metadata": {"payload_hash": payload_hash, "source": "submission"},
+            },
         )
+        print(f"Queued text submission for upsert: {submission_id}")
 
-        # Filter relevant prompts
-        submission_type = "text"
-        relevant_prompts = [
-            p
-            for p in prompts
-            if p.get("type") in [submission_type, "general", "script"]
-        ]
-        selected_prompts = relevant_prompts[:3]
-
-        prompt_blocks = "\n".join(
-            [
-                f"{i+1}. {p['question']}\n- Corrections:\n- What went well:"
-                for i, p in enumerate(selected_prompts)
-            ]
+        # Get relevant brief
+        brief = await find_relevant_brief(submission_embedding)
+        most_relevant_brief = brief["text"]
+        yield "brief_matched", {"brief_id": brief["id"], "score": brief.get("score")}
+
+        # Compiled prompt set, hot-reloaded when the questions file changes
+        prompt_set = prompt_registry.get()
+        template = TEMPLATES["text"]
+        questions = await question_selector.select(
+            prompt_set, "text", brief, submission_embedding
         )
+        yield "questions_selected", {"questions": [q["question"] for q in questions]}
 
-        # Create evaluation prompt
-        combined_prompt = (
-            "You are a brand evaluating influencer submissions.\n"
-            "You are given:\n"
-            "1. A campaign brief (summarized).\n"
-            "2. A submission from an influencer (text).\n"
-            "3. A list of relevant evaluation questions.\n\n"
-            "Evaluate the submission using all relevant questions internally,\n"
-            "but only output detailed answers for the top 3 most relevant questions.\n"
-            "For each selected question:\n"
-            "- Provide a short bullet point for 'corrections' (if any). If none, write 'No corrections needed'.\n"
-            "- Provide a short bullet point for 'what went well'.\n\n"
-            "At the end, include a final summary with:\n"
-            "- Top-level corrections.\n"
-            "- What the influencer did well.\n"
-            "- A decision: 'ACCEPT' or 'REJECT' (strictly one of these only).\n"
-            "Respond in this exact JSON format:\n"
-            '{\n  "questions": [\n    {"question": "...", "corrections": "...", "what_went_well": "..."},\n    ...\n  ],\n  "summary": {\n    "corrections": "...",\n    "what_went_well": "...",\n    "decision": "ACCEPT" or "REJECT"\n  }\n}\n\n'
-            f"Brief:\n{most_relevant_brief}\n\n"
-            f"Submission:\n{submission.text}\n\n"
-            f"Questions:\n{prompt_blocks}\n"
-        )
+        async def build_prompt() -> str:
+            # Long scripts are condensed to the prompt budget first
+            submission_text = await fit_prompt_budget(submission.text)
+            return prompt_set.render(
+                "text", most_relevant_brief, submission_text, questions
+            )
 
         # Get evaluation from GPT-4
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an AI that evaluates influencer content. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
-                },
-                {"role": "user", "content": combined_prompt},
-            ],
-            temperature=0.2,  # Lower temperature for more consistent JSON formatting
-            max_tokens=2000,
-            response_format={"type": "json_object"},  # Enforce JSON response
+        # Identical submissions share one GPT-4 call and its cached result
+        cache_key = make_result_key(
+            "text", submission.text, brief["id"], prompt_set.version, template.model
         )
+        async for event in evaluation_events(cache_key, template, build_prompt, stream):
+            yield event
 
-        # Debug: Print raw response content
-        raw_content = response.choices[0].message.content
-        print("Raw GPT-4 response:")
-        print(raw_content)
-
-        if not raw_content or raw_content.isspace():
-            raise HTTPException(
-                status_code=500, detail="Received empty response from GPT-4"
-            )
-
-        try:
-            evaluation = json.loads(raw_content)
-
-            # Validate response structure
-            required_keys = {"questions", "summary"}
-            if not all(key in evaluation for key in required_keys):
-                raise ValueError(
-                    "Response missing required keys: questions and/or summary"
-                )
-
-            if not isinstance(evaluation["questions"], list):
-                raise ValueError("'questions' must be a list")
-
-            if not isinstance(evaluation["summary"], dict):
-                raise ValueError("'summary' must be an object")
-
-            required_summary_keys = {"corrections", "what_went_well", "decision"}
-            if not all(key in evaluation["summary"] for key in required_summary_keys):
-                raise ValueError("Summary missing required keys")
-
-            print("Successfully validated JSON response structure")
-            return EvaluationResponse(evaluation=evaluation)
-
-        except json.JSONDecodeError as je:
-            print(f"JSON parse error at position {je.pos}: {je.msg}")
-            print(f"Content around error: {raw_content[max(0, je.pos-50):je.pos+50]}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to parse GPT-4 response as JSON. Error: {str(je)}",
-            )
-        except ValueError as ve:
-            raise HTTPException(
-                status_code=500, detail=f"Invalid response structure: {str(ve)}"
-            )
-
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise  # Re-raise HTTP exceptions as is
     except Exception as e:
         print(f"Error during evaluation: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Failed to generate evaluation: {str(e)}"
         )
+
+
+@router.post(
+    "/",
+    response_model=EvaluationResponse,
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def evaluate_text_submission(submission: TextSubmission):
+    evaluation = await final_result(text_evaluation_events(submission))
+    return EvaluationResponse(evaluation=evaluation)
+
+
+@router.post(
+    "/stream",
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def stream_text_submission(submission: TextSubmission):
+    """Evaluate a text submission, streaming progress as server-sent events."""
+    return await sse_response(text_evaluation_events(submission, stream=True))
+
+
+@router.post(
+    "/batch",
+    response_model=BatchEvaluationResponse,
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def evaluate_text_batch(batch: TextBatchSubmission):
+    """Evaluate many text submissions with one embedding request.
+
+    Results are returned per submission, in request order; one failing
+    submission does not fail the batch.
+    """
+    texts = [submission.text for submission in batch.submissions]
+    embeddings = await embed_long_texts(texts)
+
+    # Queue all submissions for the batched background upsert
+    payload_hashes = await run_io(payload_store.put_many, texts)
+    for payload_hash, embedding in zip(payload_hashes, embeddings):
+        submission_writer.enqueue(
+            "text-submission",
+            {
+                "id": f"text_{uuid.uuid4().hex}",
+                "values": embedding,
+                "metadata": {"payload_hash": payload_hash, "source": "submission"},
+            },
+        )
+    print(f"Queued {len(texts)} text submissions for upsert")
+
+    results = await evaluate_embedded(
+        "text",
+        [
+            {"index": i, "content": text, "text": text, "embedding": embedding}
+            for i, (text, embedding) in enumerate(zip(texts, embeddings))
+        ],
+    )
+    return batch_response(results)
@@ -1,12 +1,28 @@
-import os
-import json
+import asyncio
+import functools
 import re
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, field_validator
-from openai import OpenAI
-from config import OPENAI_API_KEY, BRIEF_PROMPT_PATH
-from utils import init_pinecone, get_embedding, get_relevant_brief
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+from pydantic import BaseModel, Field, field_validator
+from readiness import require_ready
+from submission_writer import submission_writer
+from result_cache import make_result_key
+from streaming import evaluation_events, final_result, sse_response
+from jobs import JobAccepted, job_runner, submit_job
+from utils import find_relevant_brief
+from prompts import prompt_registry, TEMPLATES
+from question_selector import question_selector
+from long_text import embed_long_texts, fit_prompt_budget
+from batch import (
+    BatchEvaluationResponse,
+    batch_response,
+    evaluate_embedded,
+    item_error,
+)
+from config import BATCH_MAX_ITEMS
+from executors import run_io
+from transcript_store import transcript_store
+from payload_store import payload_store
 from youtube_transcript_api import YouTubeTranscriptApi
 import datetime
 
@@ -24,10 +40,28 @@ class VideoSubmission(BaseModel):
         return v
 
 
+class VideoBatchSubmission(BaseModel):
+    submissions: list[VideoSubmission] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
 class EvaluationResponse(BaseModel):
     evaluation: dict
 
 
+class PrefetchItemResult(BaseModel):
+    index: int
+    video_id: str | None = None
+    status: Literal["cached", "fetched", "error"]
+    error: dict | None = None
+
+
+class VideoPrefetchResponse(BaseModel):
+    cached: int
+    fetched: int
+    failed: int
+    results: list[PrefetchItemResult]
+
+
 def get_video_id(youtube_url: str) -> str:
     """Extract video ID from YouTube URL."""
     video_id_match = re.search(r"(?:v=|youtu.be/)([\w-]{11})", youtube_url)
@@ -49,15 +83,77 @@ def get_video_transcript(video_id: str) -> str:
         raise ValueError(f"Failed to fetch video transcript: {str(e)}")
 
 
-@router.post("/", response_model=EvaluationResponse)
-async def evaluate_video_submission(submission: VideoSubmission):
-    """Evaluate a video submission from YouTube.
+async def load_transcript(video_id: str) -> dict:
+    """Return the transcript record of a video, see TranscriptStore.
+
+    The transcript service is only called when the store has no copy
+    younger than TRANSCRIPT_TTL. "cached" tells whether it was used.
+    """
+    record = await run_io(transcript_store.get, video_id)
+    if record is not None:
+        print(f"Using stored transcript for video ID: {video_id}")
+        return {**record, "cached": True}
+    transcript = await run_io(get_video_transcript, video_id)
+    record = await run_io(transcript_store.put, video_id, transcript)
+    return {**record, "cached": False}
+
+
+async def embed_transcripts(records: list[dict], youtube_urls: list[str]) -> None:
+    """Fill in the "embedding" of transcript records, embedding only new content.
+
+    Records whose exact transcript was embedded before keep that vector and
+    are already in the video-submission namespace, so they are not upserted
+    again. The rest are embedded in one batched call and queued for upsert;
+    their embedding is stored once the writer confirms the upsert, so a
+    dropped batch is retried on the next request for the video.
+    """
+    pending = [
+        (record, youtube_url)
+        for record, youtube_url in zip(records, youtube_urls)
+        if record["embedding"] is None
+    ]
+    if not pending:
+        return
+
+    texts = [record["transcript"] for record, _ in pending]
+    # Long transcripts are chunked and pooled
+    embeddings = await embed_long_texts(texts)
+    # Transcripts go to the payload store; metadata only references their hash
+    payload_hashes = await run_io(payload_store.put_many, texts)
+
+    # Queue for a batched background upsert with timestamp and metadata
+    timestamp = datetime.datetime.now(datetime.UTC)
+    for (record, youtube_url), embedding, payload_hash in zip(
+        pending, embeddings, payload_hashes
+    ):
+        record["embedding"] = embedding
+        submission_writer.enqueue(
+            "video-submission",
+            {
+                "id": record["video_id"],
+                "values": embedding,
+                "metadata": {
+                    "payload_hash": payload_hash,
+                    "source": youtube_url,
+                    "type": "youtube_video",
+                    "timestamp": str(timestamp),
+                    "submission_type": "video",
+                },
+            },
+            on_upserted=functools.partial(
+                transcript_store.put_embeddings,
+                [(record["video_id"], record["hash"], embedding)],
+            ),
+        )
+    print(f"Queued {len(pending)} video submissions for upsert")
+
+
+async def video_evaluation_events(submission: VideoSubmission, stream: bool = False):
+    """Evaluation pipeline for a YouTube video submission, as (event, data) pairs.
 
     Args:
         submission: VideoSubmission object containing the YouTube URL
-
-    Returns:
-        EvaluationResponse containing the evaluation results
+        stream: Stream the GPT-4 completion question by question
 
     Raises:
         HTTPException: If any step in the evaluation process fails
@@ -68,47 +164,26 @@ async def evaluate_video_submission(submission: VideoSubmission):
         # Extract video ID and get transcript
         try:
             video_id = get_video_id(submission.youtube_url)
-            transcript = get_video_transcript(video_id)
+            record = await load_transcript(video_id)
+            transcript = record["transcript"]
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to process video submission: {str(e)}"
             )
+        yield "transcript_fetched", {
+            "video_id": video_id,
+            "characters": len(transcript),
+            "cached": record["cached"],
+        }
 
-        # Initialize Pinecone and get embedding
+        # Get embedding; embedded and upserted only if this transcript was not before
         try:
-            index = init_pinecone()
-            print("Successfully initialized Pinecone index")
-
-            # Get embedding for transcript
-            transcript_embedding = get_embedding(transcript)
+            await embed_transcripts([record], [submission.youtube_url])
+            transcript_embedding = record["embedding"]
             print("Successfully generated transcript embedding")
 
-            # Upsert to Pinecone with timestamp and metadata
-            timestamp = datetime.datetime.now(datetime.UTC)
-            index.upsert(
-                namespace="video-submission",
-                vectors=[
-                    {
-                        "id": video_id,
-                        "values": transcript_embedding,
-                        "metadata": {
-                            "chunk_text": transcript,
-                            "source": submission.youtube_url,
-                            "type": "youtube_video",
-                            "timestamp": str(timestamp),
-                            "submission_type": "video",
-                        },
-                    }
-                ],
-            )
-            print(f"Successfully upserted video submission: {video_id}")
-
-            # Verify upsert by checking stats
-            stats = index.describe_index_stats()
-            print(f"Index stats after upsert: {stats}")
-
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -117,170 +192,201 @@ async def evaluate_video_submission(submission: VideoSubmission):
 
         # Get relevant brief
         try:
-            most_relevant_brief = get_relevant_brief(index, transcript_embedding)
+            brief = await find_relevant_brief(transcript_embedding)
+            most_relevant_brief = brief["text"]
             if not most_relevant_brief:
                 raise HTTPException(
                     status_code=404, detail="No matching brief found for the submission"
                 )
             print("Successfully retrieved relevant brief")
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to retrieve relevant brief: {str(e)}"
             )
+        yield "brief_matched", {"brief_id": brief["id"], "score": brief.get("score")}
 
-        # Load and validate prompt questions
-        try:
-            prompt_path = Path(BRIEF_PROMPT_PATH)
-            if not prompt_path.exists():
-                raise HTTPException(
-                    status_code=404, detail="Prompt questions file not found"
-                )
+        # Compiled prompt set, hot-reloaded when the questions file changes
+        prompt_set = prompt_registry.get()
+        template = TEMPLATES["video"]
+        questions = await question_selector.select(
+            prompt_set, "video", brief, transcript_embedding
+        )
+        yield "questions_selected", {"questions": [q["question"] for q in questions]}
 
-            prompt_data = json.loads(prompt_path.read_text(encoding="utf-8"))
-            prompts = (
-                prompt_data
-                if isinstance(prompt_data, list)
-                else prompt_data.get("prompts", [])
+        async def build_prompt() -> str:
+            # Long transcripts are condensed to the prompt budget first
+            submission_text = await fit_prompt_budget(transcript)
+            return prompt_set.render(
+                "video", most_relevant_brief, submission_text, questions
             )
 
-            if not prompts:
-                raise HTTPException(
-                    status_code=500, detail="No evaluation prompts found"
-                )
-            print("Successfully loaded prompt questions")
-        except json.JSONDecodeError:
-            raise HTTPException(
-                status_code=500, detail="Failed to parse prompt questions file"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to load prompt questions: {str(e)}"
+        print("Getting evaluation from GPT-4...")
+        try:
+            # Identical submissions share one GPT-4 call and its cached result;
+            # the transcript hash keys out evaluations of an older transcript
+            cache_key = make_result_key(
+                "video",
+                f"{video_id}#{record['hash']}",
+                brief["id"],
+                prompt_set.version,
+                template.model,
             )
+            async for event in evaluation_events(
+                cache_key, template, build_prompt, stream
+            ):
+                yield event
+            print("Successfully generated evaluation")
 
-        # Filter relevant prompts
-        submission_type = "video"
-        relevant_prompts = [
-            p for p in prompts if p.get("type") in [submission_type, "general"]
-        ]
-        if not relevant_prompts:
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error generating evaluation: {str(e)}")
             raise HTTPException(
-                status_code=500, detail="No relevant prompts found for video submission"
+                status_code=500, detail=f"Failed to generate evaluation: {str(e)}"
             )
 
-        selected_prompts = relevant_prompts[:3]
-        print(f"Selected {len(selected_prompts)} relevant prompts")
-
-        prompt_blocks = "\n".join(
-            [
-                f"{i+1}. {p['question']}\n- Corrections:\n- What went well:"
-                for i, p in enumerate(selected_prompts)
-            ]
+    except HTTPException:
+        raise  # Re-raise HTTP exceptions as is
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Unexpected error during evaluation: {str(e)}"
         )
 
-        # Create evaluation prompt
-        combined_prompt = (
-            "You are a brand evaluating influencer submissions.\n"
-            "You are given:\n"
-            "1. A campaign brief (summarized).\n"
-            "2. A submission from an influencer (a YouTube video transcript).\n"
-            "3. A list of relevant evaluation questions.\n\n"
-            "Evaluate the submission using all relevant questions internally,\n"
-            "but only output detailed answers for the top 3 most relevant questions.\n"
-            "For each selected question:\n"
-            "- Provide a short bullet point for 'corrections' (if any). If none, write 'No corrections needed'.\n"
-            "- Provide a short bullet point for 'what went well'.\n\n"
-            "At the end, include a final summary with:\n"
-            "- Top-level corrections.\n"
-            "- What the influencer did well.\n"
-            "- A decision: 'ACCEPT' or 'REJECT' (strictly one of these only).\n"
-            "Respond in this exact JSON format:\n"
-            '{\n  "questions": [\n    {"question": "...", "corrections": "...", "what_went_well": "..."},\n    ...\n  ],\n  "summary": {\n    "corrections": "...",\n    "what_went_well": "...",\n    "decision": "ACCEPT" or "REJECT"\n  }\n}\n\n'
-            f"Brief:\n{most_relevant_brief}\n\n"
-            f"Submission:\n{transcript}\n\n"
-            f"Questions:\n{prompt_blocks}\n"
-        )
 
-        print("Getting evaluation from GPT-4...")
-        try:
-            # Get evaluation from GPT-4
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an AI that evaluates influencer content. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
-                    },
-                    {
-                        "role": "user",
-                        "content": combined_prompt,
-                    },
-                ],
-                temperature=0.2,  # Lower temperature for more consistent JSON formatting
-                max_tokens=2000,
-                response_format={"type": "json_object"},  # Enforce JSON response
-            )
+@router.post(
+    "/",
+    response_model=EvaluationResponse,
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def evaluate_video_submission(submission: VideoSubmission):
+    """Evaluate a video submission from YouTube.
 
-            # Debug: Print raw response content
-            raw_content = response.choices[0].message.content
-            print("Raw GPT-4 response:")
-            print(raw_content)
+    Args:
+        submission: VideoSubmission object containing the YouTube URL
 
-            if not raw_content or raw_content.isspace():
-                raise HTTPException(
-                    status_code=500, detail="Received empty response from GPT-4"
-                )
+    Returns:
+        EvaluationResponse containing the evaluation results
 
-            try:
-                evaluation = json.loads(raw_content)
+    Raises:
+        HTTPException: If any step in the evaluation process fails
+    """
+    evaluation = await final_result(video_evaluation_events(submission))
+    return EvaluationResponse(evaluation=evaluation)
+
+
+@router.post(
+    "/stream",
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def stream_video_submission(submission: VideoSubmission):
+    """Evaluate a video submission, streaming progress as server-sent events."""
+    return await sse_response(video_evaluation_events(submission, stream=True))
+
+
+@router.post(
+    "/batch",
+    response_model=BatchEvaluationResponse,
+    dependencies=[Depends(require_ready("vectorstore", "prompts"))],
+)
+async def evaluate_video_batch(batch: VideoBatchSubmission):
+    """Evaluate many YouTube videos with one embedding request.
+
+    Transcripts come from the transcript store or are fetched concurrently
+    on the I/O pool. Results are returned per submission, in request order;
+    videos whose transcript cannot be fetched are reported as failed
+    without failing the batch.
+    """
+    video_ids = [get_video_id(s.youtube_url) for s in batch.submissions]
+    records = await asyncio.gather(
+        *(load_transcript(video_id) for video_id in video_ids),
+        return_exceptions=True,
+    )
+
+    results, fetched = [], []
+    for i, record in enumerate(records):
+        if isinstance(record, BaseException):
+            results.append(item_error(i, record))
+        else:
+            fetched.append((i, record))
+
+    await embed_transcripts(
+        [record for _, record in fetched],
+        [batch.submissions[i].youtube_url for i, _ in fetched],
+    )
+    items = [
+        {
+            "index": i,
+            "content": f"{record['video_id']}#{record['hash']}",
+            "text": record["transcript"],
+            "embedding": record["embedding"],
+        }
+        for i, record in fetched
+    ]
+    results.extend(await evaluate_embedded("video", items))
+    return batch_response(results)
+
+
+@router.post("/prefetch", response_model=VideoPrefetchResponse)
+async def prefetch_videos(batch: VideoBatchSubmission):
+    """Fetch and embed transcripts ahead of evaluation.
+
+    Transcripts are fetched concurrently and stored by video id; new ones
+    are embedded in one request. Later evaluations of these videos within
+    TRANSCRIPT_TTL call neither the transcript service nor the embedding API.
+    """
+    video_ids = [get_video_id(s.youtube_url) for s in batch.submissions]
+    records = await asyncio.gather(
+        *(load_transcript(video_id) for video_id in video_ids),
+        return_exceptions=True,
+    )
+
+    results, fetched = [], []
+    for i, (video_id, record) in enumerate(zip(video_ids, records)):
+        if isinstance(record, BaseException):
+            results.append({**item_error(i, record), "video_id": video_id})
+        else:
+            fetched.append((i, record))
+            results.append(
+                {
+                    "index": i,
+                    "video_id": video_id,
+                    "status": "cached" if record["cached"] else "fetched",
+                }
+            )
 
-                # Validate response structure
-                required_keys = {"questions", "summary"}
-                if not all(key in evaluation for key in required_keys):
-                    raise ValueError(
-                        "Response missing required keys: questions and/or summary"
-                    )
+    try:
+        await embed_transcripts(
+            [record for _, record in fetched],
+            [batch.submissions[i].youtube_url for i, _ in fetched],
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to embed transcripts: {str(e)}"
+        )
 
-                if not isinstance(evaluation["questions"], list):
-                    raise ValueError("'questions' must be a list")
+    statuses = [r["status"] for r in results]
+    return VideoPrefetchResponse(
+        cached=statuses.count("cached"),
+        fetched=statuses.count("fetched"),
+        failed=statuses.count("error"),
+        results=results,
+    )
 
-                if not isinstance(evaluation["summary"], dict):
-                    raise ValueError("'summary' must be an object")
 
-                required_summary_keys = {"corrections", "what_went_well", "decision"}
-                if not all(
-                    key in evaluation["summary"] for key in required_summary_keys
-                ):
-                    raise ValueError("Summary missing required keys")
+async def run_video_job(payload: dict) -> dict:
+    return await final_result(video_evaluation_events(VideoSubmission(**payload)))
 
-                print("Successfully validated JSON response structure")
 
-            except json.JSONDecodeError as je:
-                print(f"JSON parse error at position {je.pos}: {je.msg}")
-                print(
-                    f"Content around error: {raw_content[max(0, je.pos-50):je.pos+50]}"
-                )
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to parse GPT-4 response as JSON. Error: {str(je)}",
-                )
-            except ValueError as ve:
-                raise HTTPException(
-                    status_code=500, detail=f"Invalid response structure: {str(ve)}"
-                )
+job_runner.register("video", run_video_job)
 
-            print("Successfully generated evaluation")
-            return EvaluationResponse(evaluation=evaluation)
 
-        except Exception as e:
-            print(f"Error generating evaluation: {str(e)}")
-            raise HTTPException(
-                status_code=500, detail=f"Failed to generate evaluation: {str(e)}"
-            )
+@router.post("/jobs", response_model=JobAccepted, status_code=202)
+async def submit_video_job(submission: VideoSubmission):
+    """Queue a video evaluation and return at once; poll /jobs/{job_id} for the result.
 
-    except HTTPException:
-        raise  # Re-raise HTTP exceptions as is
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Unexpected error during evaluation: {str(e)}"
-        )
+    Jobs are accepted while the system is still initializing and run once
+    it is ready.
+    """
+    return await submit_job("video", submission.model_dump())
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from executors import run_io
+from jobs import JobStatus, job_runner
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Status of a queued evaluation job, with its evaluation once it succeeded."""
+    job = await run_io(job_runner.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(
+        job_id=job["id"],
+        type=job["type"],
+        status=job["status"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        evaluation=job["result"],
+        error=job["error"],
+    )
@@ -0,0 +1,61 @@
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from config import BATCH_MAX_ITEMS
+from executors import run_io
+from payload_store import payload_store
+from utils import get_index
+
+router = APIRouter()
+
+
+class SubmissionLookup(BaseModel):
+    namespace: Literal["text-submission", "video-submission"]
+    ids: list[str] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class StoredSubmission(BaseModel):
+    id: str
+    found: bool
+    text: str | None = None
+    metadata: dict | None = None
+
+
+class SubmissionLookupResponse(BaseModel):
+    results: list[StoredSubmission]
+
+
+@router.post("/lookup", response_model=SubmissionLookupResponse)
+async def lookup_submissions(lookup: SubmissionLookup):
+    """Recover stored submissions by vector id.
+
+    Metadata comes from one Pinecone fetch and the bodies from one batched
+    payload store lookup. "text" is None when the body was deleted after
+    PAYLOAD_RETENTION.
+    """
+    try:
+        index = await run_io(get_index)
+        response = await run_io(index.fetch, ids=lookup.ids, namespace=lookup.namespace)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch submissions: {str(e)}"
+        )
+
+    metadatas = {
+        vector_id: dict(vector.metadata or {})
+        for vector_id, vector in response.vectors.items()
+    }
+    found = [vector_id for vector_id in lookup.ids if vector_id in metadatas]
+    texts = await run_io(payload_store.resolve, [metadatas[i] for i in found])
+    texts = dict(zip(found, texts))
+    return SubmissionLookupResponse(
+        results=[
+            StoredSubmission(
+                id=vector_id,
+                found=vector_id in metadatas,
+                text=texts.get(vector_id),
+                metadata=metadatas.get(vector_id),
+            )
+            for vector_id in lookup.ids
+        ]
+    )
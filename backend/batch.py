@@ -0,0 +1,104 @@
+import asyncio
+from typing import Literal
+from fastapi import HTTPException
+from pydantic import BaseModel
+from config import BATCH_CONCURRENCY
+from long_text import fit_prompt_budget
+from prompts import prompt_registry, TEMPLATES
+from question_selector import question_selector
+from result_cache import result_cache, make_result_key
+from utils import find_relevant_briefs, generate_evaluation
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: Literal["ok", "error"]
+    evaluation: dict | None = None
+    error: dict | None = None
+
+
+class BatchEvaluationResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
+
+
+def item_error(index: int, error: BaseException) -> dict:
+    """Per-item failure entry, mirroring the status a single request would get."""
+    if isinstance(error, HTTPException):
+        status, detail = error.status_code, error.detail
+    elif isinstance(error, ValueError):
+        status, detail = 400, str(error)
+    else:
+        status, detail = 500, f"Failed to generate evaluation: {str(error)}"
+    print(f"Batch item {index} failed ({status}): {detail}")
+    return {
+        "index": index,
+        "status": "error",
+        "error": {"status": status, "detail": detail},
+    }
+
+
+def batch_response(results: list[dict]) -> BatchEvaluationResponse:
+    results = sorted(results, key=lambda r: r["index"])
+    succeeded = sum(r["status"] == "ok" for r in results)
+    return BatchEvaluationResponse(
+        succeeded=succeeded, failed=len(results) - succeeded, results=results
+    )
+
+
+async def evaluate_embedded(submission_type: str, items: list[dict]) -> list[dict]:
+    """Evaluate already embedded submissions of one type.
+
+    `items` hold "index", "content" (the result cache key content), "text"
+    (the submission as put in the prompt) and "embedding". Briefs are
+    matched for all items in one vectorized pass, and at most
+    BATCH_CONCURRENCY GPT-4 calls run at once; cached and duplicate
+    submissions do not take a slot. Failures are reported per item.
+    """
+    if not items:
+        return []
+
+    briefs = await find_relevant_briefs([item["embedding"] for item in items])
+    prompt_set = prompt_registry.get()
+    template = TEMPLATES[submission_type]
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def evaluate(item: dict, brief) -> dict:
+        if isinstance(brief, BaseException):
+            raise brief
+        questions = await question_selector.select(
+            prompt_set, submission_type, brief, item["embedding"]
+        )
+
+        async def compute() -> dict:
+            async with semaphore:
+                submission_text = await fit_prompt_budget(item["text"])
+                prompt = prompt_set.render(
+                    submission_type, brief["text"], submission_text, questions
+                )
+                return await generate_evaluation(
+                    template.system, prompt, model=template.model
+                )
+
+        cache_key = make_result_key(
+            submission_type,
+            item["content"],
+            brief["id"],
+            prompt_set.version,
+            template.model,
+        )
+        return await result_cache.get_or_compute(cache_key, compute)
+
+    outcomes = await asyncio.gather(
+        *(evaluate(item, brief) for item, brief in zip(items, briefs)),
+        return_exceptions=True,
+    )
+    return [
+        (
+            item_error(item["index"], outcome)
+            if isinstance(outcome, BaseException)
+            else {"index": item["index"], "status": "ok", "evaluation": outcome}
+        )
+        for item, outcome in zip(items, outcomes)
+    ]
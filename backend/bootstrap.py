@@ -0,0 +1,40 @@
+import asyncio
+from config import ENABLE_IMAGE_ROUTE, CLIP_WARMUP
+from brief_index import brief_index, clip_brief_index
+from long_text import get_encoding
+from prompts import prompt_registry
+from question_selector import question_selector
+from utils import ensure_clip_brief_index, get_index, setup_evaluation_system
+
+# Shared by the API (main.lifespan) and the offline CLI, so the CLI does not
+# have to import the FastAPI app and the image route with it
+
+
+async def run_bootstrap() -> None:
+    """Run the blocking evaluation system setup off the event loop."""
+    print("\nInitializing evaluation system in the background...")
+    # Load the local brief index left by the previous run
+    await asyncio.to_thread(brief_index.load)
+    await asyncio.to_thread(clip_brief_index.load)
+    try:
+        # Create the shared Pinecone index handle before serving evaluations
+        await asyncio.to_thread(get_index)
+    except Exception as e:
+        print(f"Warning: Failed to connect to Pinecone: {str(e)}")
+    await asyncio.to_thread(setup_evaluation_system)
+    try:
+        # Load the tokenizer used to budget long transcripts and scripts
+        await asyncio.to_thread(get_encoding)
+    except Exception as e:
+        print(f"Warning: Failed to load tokenizer: {str(e)}")
+    if ENABLE_IMAGE_ROUTE and CLIP_WARMUP:
+        try:
+            # CLIP is loaded anyway; encode the briefs for image matching now too
+            await asyncio.to_thread(ensure_clip_brief_index)
+        except Exception as e:
+            print(f"Warning: Failed to build the CLIP brief index: {str(e)}")
+    try:
+        # Embed the evaluation questions before the first request needs them
+        await question_selector.matrix_for(prompt_registry.get())
+    except Exception as e:
+        print(f"Warning: Failed to embed evaluation questions: {str(e)}")
@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+import numpy as np
+from config import (
+    BRIEF_INDEX_PATH,
+    CLIP_BRIEF_INDEX_PATH,
+    INGEST_MANIFEST_PATH,
+    BRIEF_INDEX_CHECK_INTERVAL,
+)
+
+
+class BriefIndex:
+    """In-process copy of the `brief` namespace for local cosine matching.
+
+    Holds a row-normalized float32 matrix of brief embeddings with their ids
+    and summary texts, so matching a submission is one matrix-vector product
+    instead of a Pinecone round trip. The copy is persisted next to the
+    ingestion manifest and tagged with the manifest revision it was built
+    from; when the two disagree the index reports itself stale and callers
+    fall back to Pinecone.
+    """
+
+    def __init__(
+        self, path=BRIEF_INDEX_PATH, check_interval: float = BRIEF_INDEX_CHECK_INTERVAL
+    ):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._ids = np.array([], dtype=str)
+        self._texts = np.array([], dtype=str)
+        self._hashes = np.array([], dtype=str)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._revision = None
+        self._manifest_revision = None
+        self._mtimes = (None, None)
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _refresh(self) -> None:
+        """Reload the persisted copy or manifest revision if either file changed."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            mtimes = tuple(
+                p.stat().st_mtime_ns if p.exists() else None
+                for p in (self.path, INGEST_MANIFEST_PATH)
+            )
+            if mtimes == self._mtimes:
+                return
+            if mtimes[0] != self._mtimes[0] and mtimes[0] is not None:
+                with np.load(self.path) as data:
+                    self._set(
+                        data["ids"],
+                        data["texts"],
+                        data["hashes"],
+                        data["vectors"],
+                        str(data["revision"]),
+                    )
+            if mtimes[1] is not None:
+                try:
+                    manifest = json.loads(
+                        INGEST_MANIFEST_PATH.read_text(encoding="utf-8")
+                    )
+                    self._manifest_revision = manifest.get("revision")
+                except (json.JSONDecodeError, OSError):
+                    self._manifest_revision = None
+            self._mtimes = mtimes
+
+    def _set(self, ids, texts, hashes, vectors, revision: str) -> None:
+        self._ids = np.asarray(ids, dtype=str)
+        self._texts = np.asarray(texts, dtype=str)
+        self._hashes = np.asarray(hashes, dtype=str)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self._matrix = self._normalize(matrix) if len(matrix) else matrix
+        self._revision = revision
+
+    def load(self) -> None:
+        """Load the persisted copy now, e.g. at startup."""
+        self._checked_at = 0.0
+        self._refresh()
+
+    def replace(
+        self,
+        ids: list[str],
+        texts: list[str],
+        hashes: list[str],
+        vectors: list[list[float]],
+        revision: str,
+    ) -> None:
+        """Swap in a new set of brief vectors and persist it.
+
+        `hashes` are the brief content hashes each vector was embedded from.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.stem + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.asarray(ids, dtype=str),
+            texts=np.asarray(texts, dtype=str),
+            hashes=np.asarray(hashes, dtype=str),
+            vectors=np.asarray(vectors, dtype=np.float32),
+            revision=np.asarray(revision),
+        )
+        tmp_path.replace(self.path)
+        with self._lock:
+            self._set(ids, texts, hashes, vectors, revision)
+            self._manifest_revision = revision
+            self._mtimes = (self.path.stat().st_mtime_ns, self._mtimes[1])
+
+    def vectors_by_id(self) -> dict[str, tuple[str, np.ndarray]]:
+        """Map vector id to (brief content hash, normalized vector)."""
+        self._refresh()
+        with self._lock:
+            return dict(
+                zip(self._ids.tolist(), zip(self._hashes.tolist(), self._matrix))
+            )
+
+    def vector(self, vector_id: str) -> np.ndarray | None:
+        """Normalized vector for one brief id, or None if it is not indexed."""
+        self._refresh()
+        with self._lock:
+            positions = np.flatnonzero(self._ids == vector_id)
+            return self._matrix[positions[0]] if len(positions) else None
+
+    def is_stale(self) -> bool:
+        self._refresh()
+        # An empty index is current when every brief was deleted
+        return self._revision is None or self._revision != self._manifest_revision
+
+    def search_batch(self, vectors, top_k: int = 1) -> list[list[dict]] | None:
+        """Top-k cosine matches for each row of `vectors`, or None if stale."""
+        if self.is_stale():
+            return None
+        with self._lock:
+            ids, texts, matrix = self._ids, self._texts, self._matrix
+        queries = self._normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if not len(ids):
+            return [[] for _ in queries]
+        if queries.shape[1] != matrix.shape[1]:
+            return None
+        scores = queries @ matrix.T
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append(
+                [
+                    {"id": str(ids[i]), "text": str(texts[i]), "score": float(row[i])}
+                    for i in ordered
+                ]
+            )
+        return results
+
+    def search(self, vector, top_k: int = 1) -> list[dict] | None:
+        """Top-k cosine matches for one vector, or None if stale."""
+        results = self.search_batch([vector], top_k)
+        return results[0] if results is not None else None
+
+    def snapshot(self) -> dict:
+        stale = self.is_stale()
+        return {"briefs": len(self._ids), "revision": self._revision, "stale": stale}
+
+
+brief_index = BriefIndex()
+# Same briefs in CLIP's joint image-text space, matched against board screenshots
+clip_brief_index = BriefIndex(path=CLIP_BRIEF_INDEX_PATH)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from config import SCREENSHOT_CONCURRENCY, SCREENSHOT_VIEWPORT
+
+
+class BrowserPool:
+    """One long-lived headless Chromium with a pool of reusable pages.
+
+    At most `max_pages` pages are in use at once; further requests queue
+    on a semaphore, which bounds Chromium's memory under load. Each page
+    lives in its own browser context and is reset to about:blank before
+    reuse. A page that errors is discarded, and a crashed or disconnected
+    browser is relaunched on the next request.
+    """
+
+    def __init__(self, max_pages: int = SCREENSHOT_CONCURRENCY):
+        self.max_pages = max_pages
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._idle = []
+        self.stats = {
+            "waiting": 0,
+            "active": 0,
+            "launches": 0,
+            "crashes": 0,
+            "pages_created": 0,
+            "screenshots": 0,
+            "wait_seconds": 0.0,
+        }
+
+    async def start(self) -> None:
+        """Launch Chromium ahead of the first screenshot."""
+        await self._ensure_browser()
+
+    async def stop(self) -> None:
+        async with self._launch_lock:
+            self._idle.clear()
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    print(f"Warning: Failed to close Chromium: {str(e)}")
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _ensure_browser(self):
+        browser = self._browser
+        if browser is not None and browser.is_connected():
+            return browser
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                self.stats["crashes"] += 1
+                print("Warning: Chromium disconnected, relaunching")
+                self._idle.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self.stats["launches"] += 1
+            print("Launched headless Chromium for screenshots")
+            return self._browser
+
+    async def _checkout(self):
+        browser = await self._ensure_browser()
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed() and page.context.browser is browser:
+                return page
+        width, height = SCREENSHOT_VIEWPORT
+        context = await browser.new_context(viewport={"width": width, "height": height})
+        self.stats["pages_created"] += 1
+        return await context.new_page()
+
+    async def _checkin(self, page, healthy: bool) -> None:
+        if (
+            healthy
+            and not page.is_closed()
+            and page.context.browser is self._browser
+            and self._browser.is_connected()
+        ):
+            try:
+                await page.goto("about:blank")
+                self._idle.append(page)
+                return
+            except Exception:
+                pass
+        try:
+            await page.context.close()
+        except Exception:
+            pass  # The browser may already be gone
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page, waiting while all `max_pages` pages are busy."""
+        self.stats["waiting"] += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["wait_seconds"] += time.perf_counter() - started
+        self.stats["active"] += 1
+
+        page = None
+        healthy = False
+        try:
+            page = await self._checkout()
+            yield page
+            healthy = True
+            self.stats["screenshots"] += 1
+        finally:
+            if page is not None:
+                await self._checkin(page, healthy)
+            self.stats["active"] -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        served = self.stats["screenshots"] or 1
+        return {
+            "max_pages": self.max_pages,
+            "queue_depth": self.stats["waiting"],
+            "active": self.stats["active"],
+            "idle": len(self._idle),
+            "connected": self._browser is not None and self._browser.is_connected(),
+            **{k: v for k, v in self.stats.items() if k not in ("waiting", "active")},
+            "avg_wait_seconds": round(self.stats["wait_seconds"] / served, 3),
+        }
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,209 @@
+"""Offline bulk evaluation without the HTTP server.
+
+Usage (from the backend directory):
+    python cli.py ../data/submissions --output ../data/evaluations.jsonl
+    python cli.py submissions.jsonl --workers 16
+"""
+
+import asyncio
+import datetime
+import json
+import sys
+from pathlib import Path
+import typer
+from tqdm import tqdm
+from config import BATCH_CONCURRENCY, print_config_status
+from readiness import bootstrap_status
+from submission_writer import submission_writer
+from streaming import final_result
+from bootstrap import run_bootstrap
+from api.evaluate_text import TextSubmission, text_evaluation_events
+from api.evaluate_video import VideoSubmission, video_evaluation_events
+
+app = typer.Typer(add_completion=False)
+
+
+def load_items(source: Path, text_field: str) -> list[dict]:
+    """Read submissions from a directory of .txt files or a JSONL manifest.
+
+    Each item has an "id", a "type" and the request payload for that type.
+    JSONL lines may set "id" (or "request_id") and "type"; otherwise the
+    type is inferred from the payload keys.
+    """
+    if source.is_dir():
+        return [
+            {"id": path.name, "type": "text", "text": path.read_text(encoding="utf-8")}
+            for path in sorted(source.glob("*.txt"))
+        ]
+
+    items = []
+    with source.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "youtube_url" in record:
+                inferred = "video"
+            elif "image_url" in record:
+                inferred = "image"
+            else:
+                inferred = "text"
+            # Computed id and type win over the raw fields, e.g. "id": null
+            item = {
+                **record,
+                "id": str(
+                    record.get("id")
+                    or record.get("request_id")
+                    or f"line-{line_number}"
+                ),
+                "type": record.get("type") or inferred,
+            }
+            if item["type"] == "text":
+                item["text"] = record.get(text_field, "")
+            items.append(item)
+    return items
+
+
+def load_checkpoint(output: Path) -> set[str]:
+    """Ids already evaluated successfully in a previous run of `output`."""
+    done = set()
+    if not output.exists():
+        return done
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line from a crashed run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def evaluation_events(item: dict):
+    if item["type"] == "text":
+        return text_evaluation_events(TextSubmission(text=item["text"]))
+    if item["type"] == "video":
+        return video_evaluation_events(VideoSubmission(youtube_url=item["youtube_url"]))
+    if item["type"] == "image":
+        # Imported on demand so text and video runs never load CLIP or Chromium
+        from api.evaluate_image import ImageSubmission, image_evaluation_events
+
+        return image_evaluation_events(
+            ImageSubmission(
+                image_url=item["image_url"],
+                force_refresh=item.get("force_refresh", False),
+            )
+        )
+    raise ValueError(f"Unsupported submission type: {item['type']}")
+
+
+async def run_evaluations(items: list[dict], output: Path, workers: int) -> dict:
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    counts = {"ok": 0, "error": 0}
+    progress = tqdm(total=len(items), desc="Evaluating")
+
+    with output.open("a+b") as f:
+        # Terminate a partial last line left by a crash so new records stay parseable
+        if f.tell():
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    with output.open("a", encoding="utf-8") as out:
+
+        def record(item: dict, result: dict) -> None:
+            result = {
+                "id": item["id"],
+                "type": item["type"],
+                **result,
+                "finished_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            }
+            # One flushed line per item is the checkpoint a resumed run reads
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            counts[result["status"]] += 1
+            progress.update(1)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    evaluation = await final_result(evaluation_events(item))
+                    record(item, {"status": "ok", "evaluation": evaluation})
+                except Exception as e:
+                    status = getattr(e, "status_code", 500)
+                    detail = getattr(e, "detail", str(e))
+                    record(
+                        item,
+                        {
+                            "status": "error",
+                            "error": {"status": status, "detail": detail},
+                        },
+                    )
+
+        submission_writer.start()
+        try:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            progress.close()
+            # Drain queued submission vectors before the process exits
+            await submission_writer.stop()
+            # Image items start Chromium and the CLIP batch thread on first use
+            if "browser_pool" in sys.modules:
+                from browser_pool import browser_pool
+
+                await browser_pool.stop()
+            if "clip_batcher" in sys.modules:
+                from clip_batcher import clip_batcher
+
+                await asyncio.to_thread(clip_batcher.stop)
+    return counts
+
+
+@app.command()
+def evaluate(
+    source: Path = typer.Argument(
+        ..., exists=True, help="Directory of .txt submissions or a JSONL manifest"
+    ),
+    output: Path = typer.Option(
+        Path("evaluations.jsonl"), help="Append-only JSONL results and checkpoint"
+    ),
+    workers: int = typer.Option(
+        BATCH_CONCURRENCY, min=1, help="Submissions evaluated concurrently"
+    ),
+    text_field: str = typer.Option("text", help="JSONL field holding text submissions"),
+    resume: bool = typer.Option(
+        True, help="Skip ids that already succeeded in the output file"
+    ),
+):
+    """Evaluate submissions in bulk with the same pipeline as the API."""
+    print_config_status()
+    items = load_items(source, text_field)
+    done = load_checkpoint(output) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    print(f"{len(items)} submissions, {len(items) - len(pending)} already evaluated")
+    if not pending:
+        return
+
+    async def run() -> dict:
+        bootstrap_status.refresh_availability()
+        await run_bootstrap()
+        if not bootstrap_status.is_available("vectorstore", "prompts"):
+            print(f"Evaluation system not ready: {bootstrap_status.snapshot()}")
+            raise typer.Exit(code=1)
+        return await run_evaluations(pending, output, workers)
+
+    counts = asyncio.run(run())
+    print(f"Done: {counts['ok']} evaluated, {counts['error']} failed -> {output}")
+    if counts["error"]:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
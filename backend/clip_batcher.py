@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from config import CLIP_BATCH_WINDOW, CLIP_BATCH_MAX_IMAGES
+from clip_encoder import encode_pixels
+
+
+class ClipBatcher:
+    """Micro-batching scheduler for CLIP image inference.
+
+    Callers submit preprocessed pixel_values and get a future. A dedicated
+    thread waits up to `window` seconds after the first pending request
+    for more, then encodes up to `max_images` images in one forward pass
+    and hands each caller its own rows. A single request larger than
+    `max_images` runs as its own batch.
+    """
+
+    def __init__(
+        self,
+        window: float = CLIP_BATCH_WINDOW,
+        max_images: int = CLIP_BATCH_MAX_IMAGES,
+        encode=encode_pixels,
+    ):
+        self.window = window
+        self.max_images = max_images
+        self.encode = encode
+        self._queue = queue.Queue()
+        self._carry = None
+        self._closed = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "images": 0,
+            "batches": 0,
+            "largest_batch": 0,
+            "failed_batches": 0,
+            "wait_seconds": 0.0,
+            "inference_seconds": 0.0,
+        }
+
+    def _ensure_thread(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(
+                    target=self._run, name="clip-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, pixel_values) -> Future:
+        """Queue a (n, 3, 224, 224) pixel_values tensor for encoding."""
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((pixel_values, future, time.perf_counter()))
+        return future
+
+    async def encode_async(self, pixel_values) -> np.ndarray:
+        """Encode `pixel_values` in a shared batch and return its unit vectors."""
+        return await asyncio.wrap_future(self.submit(pixel_values))
+
+    def stop(self, timeout: float = 5) -> None:
+        """Finish the batch in progress and stop the inference thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _collect(self) -> list | None:
+        """Block for the next request, then gather more within the window."""
+        first, self._carry = self._carry, None
+        if first is None:
+            first = self._queue.get()
+            if first is None:
+                return None
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.window
+        while size < self.max_images:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._closed = True
+                break
+            if size + len(item[0]) > self.max_images:
+                # Would overflow this batch; it starts the next one
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while not (self._closed and self._carry is None):
+            batch = self._collect()
+            if batch is None:
+                return
+            # Skip requests whose callers gave up while queued
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                import torch
+
+                pixel_values = torch.cat([pixels for pixels, _, _ in batch])
+                vectors = self.encode(pixel_values)
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                print(f"CLIP batch of {len(batch)} requests failed: {str(e)}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for pixels, future, queued_at in batch:
+                future.set_result(vectors[offset : offset + len(pixels)])
+                offset += len(pixels)
+                self.stats["wait_seconds"] += started - queued_at
+            self.stats["requests"] += len(batch)
+            self.stats["images"] += offset
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], offset)
+            self.stats["inference_seconds"] += time.perf_counter() - started
+
+    def snapshot(self) -> dict:
+        batches = self.stats["batches"] or 1
+        requests = self.stats["requests"] or 1
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "max_images": self.max_images,
+            "queue_depth": self._queue.qsize(),
+            "running": self._thread is not None and self._thread.is_alive(),
+            **{
+                k: v
+                for k, v in self.stats.items()
+                if k not in ("wait_seconds", "inference_seconds")
+            },
+            "avg_batch_images": round(self.stats["images"] / batches, 2),
+            "avg_wait_ms": round(self.stats["wait_seconds"] / requests * 1000, 1),
+            "avg_inference_ms": round(
+                self.stats["inference_seconds"] / batches * 1000, 1
+            ),
+        }
+
+
+clip_batcher = ClipBatcher()
@@ -0,0 +1,170 @@
+import io
+import math
+import numpy as np
+from PIL import Image
+from config import CLIP_TILING, CLIP_TILE_SIZE, CLIP_TILE_OVERLAP, CLIP_MAX_TILES
+from models import get_clip
+
+# Side of the square CLIP input the processor resizes every view to
+CLIP_INPUT_SIZE = 224
+# Token window of the CLIP text encoder, including start and end tokens
+CLIP_TEXT_TOKENS = 77
+
+
+def tile_positions(length: int, tile: int, overlap: float) -> list[int]:
+    """Start offsets of tiles covering `length` with at least `overlap` overlap."""
+    if length <= tile:
+        return [0]
+    stride = tile * (1 - overlap)
+    count = math.ceil((length - tile) / stride) + 1
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+
+def tile_boxes(
+    width: int,
+    height: int,
+    tile: int = CLIP_TILE_SIZE,
+    overlap: float = CLIP_TILE_OVERLAP,
+    max_tiles: int = CLIP_MAX_TILES,
+) -> list[tuple[int, int, int, int]]:
+    """Overlapping square crop boxes (left, top, right, bottom) over an image.
+
+    Tiles are `tile` pixels wide, or the short side of the image if that is
+    smaller. Tiles grow until at most `max_tiles` cover the image.
+    """
+    side = min(tile, width, height)
+    while True:
+        xs = tile_positions(width, side, overlap)
+        ys = tile_positions(height, side, overlap)
+        if len(xs) * len(ys) <= max_tiles or side >= max(width, height):
+            break
+        side = min(math.ceil(side * 1.25), max(width, height))
+    return [(x, y, min(x + side, width), min(y + side, height)) for y in ys for x in xs]
+
+
+def letterbox(image: Image.Image) -> Image.Image:
+    """Pad an image to a white square so CLIP's center crop keeps all of it."""
+    side = max(image.size)
+    if image.width == image.height:
+        return image
+    square = Image.new("RGB", (side, side), (255, 255, 255))
+    square.paste(image, ((side - image.width) // 2, (side - image.height) // 2))
+    return square
+
+
+def decode_board(data: bytes, tiling: bool = CLIP_TILING):
+    """Decode an encoded board screenshot into the views to encode.
+
+    The first view is the whole board, letterboxed. Boards larger than
+    CLIP_TILE_SIZE add their overlapping tiles, whose crop boxes are
+    returned in full-resolution pixels. The image is decoded at the
+    smallest scale that still gives every view CLIP_INPUT_SIZE pixels,
+    using JPEG DCT scaling where possible, so the full-resolution bitmap
+    is never built.
+    """
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    boxes = []
+    if tiling and max(width, height) > CLIP_TILE_SIZE:
+        boxes = tile_boxes(width, height)
+    smallest = min(
+        (min(right - left, bottom - top) for left, top, right, bottom in boxes),
+        default=max(width, height),
+    )
+    scale = max(1, smallest // CLIP_INPUT_SIZE)
+    if scale > 1:
+        # draft() picks the largest JPEG scale (1/2, 1/4, 1/8) at or above
+        # the requested size; other formats ignore it
+        image.draft("RGB", (math.ceil(width / scale), math.ceil(height / scale)))
+        remaining = max(1, image.width * scale // width)
+        if remaining > 1:
+            image = image.reduce(remaining)
+    image = image.convert("RGB")
+
+    ratio_x, ratio_y = image.width / width, image.height / height
+    # The whole-board view only needs CLIP_INPUT_SIZE pixels along its long side
+    overview = image.reduce(max(1, max(image.size) // CLIP_INPUT_SIZE))
+    views = [letterbox(overview)] + [
+        image.crop(
+            (
+                round(left * ratio_x),
+                round(top * ratio_y),
+                round(right * ratio_x),
+                round(bottom * ratio_y),
+            )
+        )
+        for left, top, right, bottom in boxes
+    ]
+    return views, boxes
+
+
+def preprocess(images: list[Image.Image]):
+    """Resize and normalize images into a CLIP pixel_values tensor."""
+    # CLIP (and torch) are loaded on first use, see models.get_clip
+    clip_processor, _ = get_clip()
+    return clip_processor(images=images, return_tensors="pt")["pixel_values"]
+
+
+def encode_pixels(pixel_values) -> np.ndarray:
+    """Encode a pixel_values batch in one CLIP forward pass into unit vectors."""
+    _, clip_model = get_clip()
+    import torch
+
+    with torch.inference_mode():
+        features = clip_model.get_image_features(pixel_values=pixel_values)
+    features = features / features.norm(p=2, dim=-1, keepdim=True)
+    return features.numpy()
+
+
+def encode_texts(texts: list[str], batch_size: int = 256) -> np.ndarray:
+    """Encode texts with the CLIP text encoder into unit vectors.
+
+    The encoder reads at most 77 tokens, so longer texts are split into
+    token windows that are encoded separately and mean-pooled.
+    """
+    clip_processor, clip_model = get_clip()
+    tokenizer = clip_processor.tokenizer
+    import torch
+
+    window = CLIP_TEXT_TOKENS - 4  # Room for special tokens and re-tokenizing drift
+    chunks, owners = [], []
+    for i, text in enumerate(texts):
+        ids = tokenizer(text, add_special_tokens=False)["input_ids"] or [0]
+        for start in range(0, len(ids), window):
+            chunks.append(tokenizer.decode(ids[start : start + window]))
+            owners.append(i)
+
+    features = []
+    for start in range(0, len(chunks), batch_size):
+        inputs = tokenizer(
+            chunks[start : start + batch_size],
+            padding=True,
+            truncation=True,
+            max_length=CLIP_TEXT_TOKENS,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            batch = clip_model.get_text_features(**inputs)
+        features.append((batch / batch.norm(p=2, dim=-1, keepdim=True)).numpy())
+    features = np.concatenate(features)
+
+    owners = np.asarray(owners)
+    pooled = np.stack([features[owners == i].mean(axis=0) for i in range(len(texts))])
+    return pooled / np.linalg.norm(pooled, axis=-1, keepdims=True)
+
+
+def pool_views(vectors: np.ndarray, boxes: list) -> dict:
+    """Pool the view vectors of one board.
+
+    Returns:
+        {"vector": normalized mean of all views, "tiles": [{"box", "vector"}, ...]}
+    """
+    pooled = vectors.mean(axis=0)
+    pooled = pooled / np.linalg.norm(pooled)
+    return {
+        "vector": pooled.tolist(),
+        "tiles": [
+            {"box": list(box), "vector": vector.tolist()}
+            for box, vector in zip(boxes, vectors[1:])
+        ],
+    }
@@ -5,6 +5,7 @@ BASE_DIR = Path(__file__).parent.parent
 
 import os
 from dotenv import load_dotenv
+
 load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 # Load .env only once from this file
@@ -14,6 +15,15 @@ load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 DATA_DIR = BASE_DIR / "data"
 BRIEF_PROMPT_PATH = DATA_DIR / "brief_prompt_questions.json"
+BRIEFS_DIR = DATA_DIR / "brief"
+SUMMARIES_DIR = DATA_DIR / "summaries"
+# Tracks which brief files (by UUID and content hash) are summarized and indexed
+INGEST_MANIFEST_PATH = SUMMARIES_DIR / "ingest_manifest.json"
+# Local copy of the brief vectors for in-process matching
+BRIEF_INDEX_PATH = SUMMARIES_DIR / "brief_index.npz"
+# Brief summaries encoded with the CLIP text encoder (512-d) for image matching
+CLIP_BRIEF_INDEX_PATH = SUMMARIES_DIR / "clip_brief_index.npz"
+BRIEF_INDEX_CHECK_INTERVAL = float(os.getenv("BRIEF_INDEX_CHECK_INTERVAL", "5"))
 
 
 # API keys and environment
@@ -21,6 +31,115 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 PINECONE_INDEX_NAME = "influencer-submission"  # Using our standardized index name
+# Seconds between background index health checks (describe_index_stats)
+PINECONE_HEALTH_INTERVAL = float(os.getenv("PINECONE_HEALTH_INTERVAL", "60"))
+# Submission vectors are upserted in the background once a namespace holds
+# SUBMISSION_BATCH_SIZE vectors or every SUBMISSION_FLUSH_INTERVAL seconds
+SUBMISSION_BATCH_SIZE = int(os.getenv("SUBMISSION_BATCH_SIZE", "50"))
+SUBMISSION_FLUSH_INTERVAL = float(os.getenv("SUBMISSION_FLUSH_INTERVAL", "2"))
+
+# Maximum number of brief summarization requests in flight at once
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+
+# Embeddings for briefs and text/video submissions
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+CACHE_DIR = DATA_DIR / "cache"
+EMBEDDING_CACHE_PATH = CACHE_DIR / "embeddings.sqlite3"
+# In-memory LRU size and on-disk entry cap (~6 KB per 1536-d vector on disk)
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "2000"))
+EMBEDDING_CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "50000"))
+# Per-request input limits of the embeddings API (2048 inputs, ~300k tokens);
+# larger batches are split into several concurrent requests
+EMBEDDING_REQUEST_MAX_ITEMS = 2048
+EMBEDDING_REQUEST_MAX_CHARS = 800_000
+
+# Evaluation results are reused for identical submissions for RESULT_CACHE_TTL seconds
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_MAX_ITEMS = int(os.getenv("RESULT_CACHE_MAX_ITEMS", "1000"))
+
+# YouTube transcripts (and their embeddings) are stored by video id and
+# refetched after TRANSCRIPT_TTL seconds; unchanged transcripts are not re-embedded
+TRANSCRIPT_STORE_PATH = CACHE_DIR / "transcripts.sqlite3"
+TRANSCRIPT_TTL = float(os.getenv("TRANSCRIPT_TTL", str(7 * 24 * 3600)))
+TRANSCRIPT_STORE_MAX_ITEMS = int(os.getenv("TRANSCRIPT_STORE_MAX_ITEMS", "20000"))
+
+# Seconds between checks of brief_prompt_questions.json for changes
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+# Number of evaluation questions picked per submission by embedding similarity
+QUESTION_TOP_N = int(os.getenv("QUESTION_TOP_N", "3"))
+
+# Batch endpoints: maximum submissions per request and concurrent GPT-4 calls
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Background evaluation jobs (POST /image/jobs, /video/jobs), queued in SQLite.
+# Each job type has its own worker pool of at most *_JOB_CONCURRENCY workers.
+JOBS_DB_PATH = DATA_DIR / "jobs" / "jobs.sqlite3"
+JOB_CONCURRENCY = {
+    "image": int(os.getenv("IMAGE_JOB_CONCURRENCY", "2")),
+    "video": int(os.getenv("VIDEO_JOB_CONCURRENCY", "4")),
+}
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Jobs interrupted this many times (e.g. by restarts) are failed, not requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs and their results are kept this many seconds
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+# A running job is leased to the process that claimed it, which renews the
+# lease every JOB_HEARTBEAT_INTERVAL seconds. Jobs whose lease is older than
+# JOB_LEASE_TIMEOUT belong to a dead process and are requeued.
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+JOB_LEASE_TIMEOUT = float(os.getenv("JOB_LEASE_TIMEOUT", "60"))
+
+# Token budgets for long transcripts and scripts (tiktoken cl100k_base tokens).
+# Texts longer than one embedding chunk are embedded in chunks and mean-pooled;
+# texts over the prompt budget are condensed map-reduce style before evaluation.
+EMBEDDING_CHUNK_TOKENS = int(os.getenv("EMBEDDING_CHUNK_TOKENS", "2000"))
+EMBEDDING_CHUNK_OVERLAP = int(os.getenv("EMBEDDING_CHUNK_OVERLAP", "100"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+CONDENSE_CHUNK_TOKENS = int(os.getenv("CONDENSE_CHUNK_TOKENS", "3000"))
+CONDENSE_CONCURRENCY = int(os.getenv("CONDENSE_CONCURRENCY", "8"))
+CONDENSE_MODEL = os.getenv("CONDENSE_MODEL", "gpt-4-turbo-preview")
+# Submission bodies, referenced from Pinecone metadata by content hash; bodies
+# neither stored nor read for PAYLOAD_RETENTION seconds are deleted
+PAYLOAD_STORE_PATH = DATA_DIR / "payloads" / "payloads.sqlite3"
+PAYLOAD_RETENTION = float(os.getenv("PAYLOAD_RETENTION", str(180 * 24 * 3600)))
+
+# Thread pools for blocking SDK calls and CPU-bound work (CLIP, image decoding)
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "2"))
+
+# Image evaluation (CLIP). Disable the route to keep torch out of the worker entirely.
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+ENABLE_IMAGE_ROUTE = os.getenv("ENABLE_IMAGE_ROUTE", "true").lower() in ("1", "true")
+# Load CLIP in the background at startup instead of on the first image request
+CLIP_WARMUP = os.getenv("CLIP_WARMUP", "false").lower() in ("1", "true")
+# Boards larger than one CLIP_TILE_SIZE px tile are also encoded as overlapping
+# tiles (at most CLIP_MAX_TILES, in the same batch) and the views are mean-pooled
+CLIP_TILING = os.getenv("CLIP_TILING", "true").lower() in ("1", "true")
+CLIP_TILE_SIZE = int(os.getenv("CLIP_TILE_SIZE", "960"))
+CLIP_TILE_OVERLAP = float(os.getenv("CLIP_TILE_OVERLAP", "0.25"))
+CLIP_MAX_TILES = int(os.getenv("CLIP_MAX_TILES", "24"))
+# Also upsert each tile vector, linked to its board by metadata "parent_id"
+CLIP_INDEX_TILES = os.getenv("CLIP_INDEX_TILES", "false").lower() in ("1", "true")
+# CLIP forward passes are shared across concurrent requests: images queued
+# within CLIP_BATCH_WINDOW_MS of each other run as one batch of up to
+# CLIP_BATCH_MAX_IMAGES views on a dedicated inference thread
+CLIP_BATCH_WINDOW = float(os.getenv("CLIP_BATCH_WINDOW_MS", "20")) / 1000
+CLIP_BATCH_MAX_IMAGES = int(os.getenv("CLIP_BATCH_MAX_IMAGES", "64"))
+# Milanote screenshots share one Chromium; at most this many pages render at once
+SCREENSHOT_CONCURRENCY = int(os.getenv("SCREENSHOT_CONCURRENCY", "4"))
+SCREENSHOT_VIEWPORT = (1920, 1080)
+# Screenshots are captured as JPEG, which CLIP preprocessing decodes at reduced scale
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "90"))
+# Board screenshots are cached by URL for SCREENSHOT_CACHE_TTL seconds,
+# trimmed to SCREENSHOT_CACHE_MAX_MB least recently used
+SCREENSHOT_CACHE_PATH = CACHE_DIR / "screenshots.sqlite3"
+SCREENSHOT_CACHE_TTL = float(os.getenv("SCREENSHOT_CACHE_TTL", "3600"))
+SCREENSHOT_CACHE_MAX_BYTES = (
+    int(os.getenv("SCREENSHOT_CACHE_MAX_MB", "500")) * 1024 * 1024
+)
 
 
 def print_config_status():
@@ -31,6 +150,8 @@ def print_config_status():
     print(f"Pinecone Environment: {PINECONE_ENVIRONMENT or '✗ Missing'}")
     print(f"Pinecone Index: {PINECONE_INDEX_NAME}")
     print(f"Data Directory: {DATA_DIR}")
+    print(f"Image Route: {'✓ Enabled' if ENABLE_IMAGE_ROUTE else '✗ Disabled'}")
+    print(f"CLIP Warm-up: {'✓ Enabled' if CLIP_WARMUP else '✗ Disabled'}")
     print("========================\n")
 
 
@@ -0,0 +1,154 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import (
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MEMORY_ITEMS,
+    EMBEDDING_CACHE_MAX_ITEMS,
+)
+
+# Keys per SELECT ... IN (...), below SQLite's limit on bound parameters
+# (999 before SQLite 3.32, 32766 since)
+_QUERY_CHUNK = 500
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: a bounded in-memory LRU backed by SQLite.
+
+    Keys hash the model name, dimension and text, so changing either setting
+    never returns a stale vector. The on-disk store is trimmed to
+    `max_items` least recently used entries.
+    """
+
+    def __init__(
+        self,
+        path=EMBEDDING_CACHE_PATH,
+        memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+        max_items: int = EMBEDDING_CACHE_MAX_ITEMS,
+    ):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+
+    @staticmethod
+    def make_key(text: str, model: str, dimensions: int) -> str:
+        return hashlib.sha256(
+            f"{model}:{dimensions}:{text}".encode("utf-8")
+        ).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+            )
+        return self._conn
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_memory(self, key: str) -> list[float] | None:
+        """Look up the in-memory tier only; safe to call on the event loop."""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return vector
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return cached vectors for `keys`, checking memory first, then disk."""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    found[key] = vector
+                else:
+                    missing.append(key)
+
+            if missing:
+                db = self._db()
+                rows = []
+                for start in range(0, len(missing), _QUERY_CHUNK):
+                    chunk = missing[start : start + _QUERY_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows += db.execute(
+                        "SELECT key, vector FROM embeddings "
+                        f"WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember(key, vector)
+                    found[key] = vector
+                if rows:
+                    db.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows],
+                    )
+                    db.commit()
+                self.stats["disk_hits"] += len(rows)
+                self.stats["misses"] += len(missing) - len(rows)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors in both tiers."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            db.commit()
+            self._puts_since_evict += len(items)
+            if self._puts_since_evict >= 100:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        self._puts_since_evict = 0
+        (count,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_items
+        if excess > 0:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            db.commit()
+            self.stats["evicted"] += excess
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "memory_items": len(self._memory)}
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,31 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import IO_WORKERS, CPU_WORKERS
+
+# Blocking SDK calls (Pinecone, YouTube transcripts) run on a bounded I/O pool
+# and CPU-heavy work (CLIP inference, image decoding) on a small separate pool,
+# so neither can starve the event loop or each other.
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking network call on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        io_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Run CPU-bound work on the CPU pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        cpu_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_executors() -> None:
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from config import (
+    JOBS_DB_PATH,
+    JOB_CONCURRENCY,
+    JOB_POLL_INTERVAL,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETENTION,
+    JOB_HEARTBEAT_INTERVAL,
+    JOB_LEASE_TIMEOUT,
+)
+from pydantic import BaseModel
+from executors import run_io
+from readiness import bootstrap_status
+
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    type: str
+    status: str
+    attempts: int
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    evaluation: dict | None = None
+    error: dict | None = None
+
+
+class JobStore:
+    """Persistent job queue in SQLite.
+
+    Jobs move from queued to running to succeeded or failed. Claiming is a
+    single UPDATE ... RETURNING, so a job is handed to exactly one worker.
+    A running job is leased to the claiming store's `worker_id` until its
+    `heartbeat_at` goes stale, so processes sharing the database only take
+    over jobs whose owner stopped renewing them.
+    """
+
+    def __init__(self, path=JOBS_DB_PATH):
+        self.path = path
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, worker_id TEXT, "
+                "heartbeat_at REAL)"
+            )
+            columns = {
+                row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")
+            }
+            for column in ("worker_id TEXT", "heartbeat_at REAL"):
+                if column.split()[0] not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs(type, status, created_at)"
+            )
+        return self._conn
+
+    def submit(self, job_type: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO jobs (id, type, payload, status, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, job_type, json.dumps(payload), time.time()),
+            )
+            db.commit()
+        return job_id
+
+    def claim(self, job_type: str) -> dict | None:
+        """Lease the oldest queued job of `job_type` to this process and return it."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, "
+                "attempts = attempts + 1, worker_id = ?, heartbeat_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE type = ? AND status = 'queued' "
+                "ORDER BY created_at LIMIT 1) RETURNING id, type, payload, attempts",
+                (now, self.worker_id, now, job_type),
+            ).fetchone()
+            db.commit()
+        if row is None:
+            return None
+        return {**dict(row), "payload": json.loads(row["payload"])}
+
+    def finish(
+        self, job_id: str, result: dict | None = None, error: dict | None = None
+    ) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND worker_id = ?",
+                (
+                    "failed" if error is not None else "succeeded",
+                    json.dumps(result) if result is not None else None,
+                    json.dumps(error) if error is not None else None,
+                    time.time(),
+                    job_id,
+                    self.worker_id,
+                ),
+            )
+            db.commit()
+
+    def release(self, job_id: str) -> None:
+        """Put an interrupted job back in the queue."""
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, "
+                "worker_id = NULL, heartbeat_at = NULL "
+                "WHERE id = ? AND status = 'running' AND worker_id = ?",
+                (job_id, self.worker_id),
+            )
+            db.commit()
+
+    def heartbeat(self) -> None:
+        """Renew the lease on every job this process is running."""
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE status = 'running' AND worker_id = ?",
+                (time.time(), self.worker_id),
+            )
+            db.commit()
+
+    def recover(
+        self,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_timeout: float = JOB_LEASE_TIMEOUT,
+    ) -> int:
+        """Requeue running jobs whose lease expired, i.e. whose process died.
+
+        Jobs that already used `max_attempts` are failed instead, so a job
+        that crashes the worker cannot loop forever. Jobs still leased by a
+        live process, including other processes sharing the database, are
+        left alone.
+        """
+        expired = "status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        deadline = time.time() - lease_timeout
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? "
+                f"WHERE {expired} AND attempts >= ?",
+                (
+                    time.time(),
+                    json.dumps({"status": 500, "detail": "Job interrupted too often"}),
+                    deadline,
+                    max_attempts,
+                ),
+            )
+            requeued = db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, "
+                f"worker_id = NULL, heartbeat_at = NULL WHERE {expired}",
+                (deadline,),
+            ).rowcount
+            db.commit()
+        return requeued
+
+    def prune(self, older_than: float = JOB_RETENTION) -> int:
+        """Delete finished jobs older than `older_than` seconds."""
+        with self._lock:
+            db = self._db()
+            deleted = db.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') "
+                "AND finished_at < ?",
+                (time.time() - older_than,),
+            ).rowcount
+            db.commit()
+        return deleted
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = (
+                self._db()
+                .execute(
+                    "SELECT id, type, status, result, error, attempts, created_at, "
+                    "started_at, finished_at FROM jobs WHERE id = ?",
+                    (job_id,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("result", "error"):
+            job[key] = json.loads(job[key]) if job[key] is not None else None
+        return job
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT type, status, COUNT(*) FROM jobs GROUP BY type, status"
+                )
+                .fetchall()
+            )
+        counts = {}
+        for job_type, status, count in rows:
+            counts.setdefault(job_type, {})[status] = count
+        return counts
+
+
+class JobRunner:
+    """In-process worker pool for queued evaluation jobs.
+
+    Routers register an async handler per job type. Each type gets its own
+    workers, capped by JOB_CONCURRENCY, so slow image jobs cannot starve
+    video jobs. Workers wait until the evaluation system is ready, and a
+    job interrupted by shutdown goes back to the queue. A heartbeat task
+    renews the leases of running jobs and requeues jobs of dead processes.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        concurrency: dict[str, int] = JOB_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        heartbeat_interval: float = JOB_HEARTBEAT_INTERVAL,
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._handlers = {}
+        self._wakeups = {}
+        self._tasks = []
+        self._running = {}
+
+    def register(self, job_type: str, handler) -> None:
+        """Run `await handler(payload) -> dict` for jobs of `job_type`."""
+        self._handlers[job_type] = handler
+
+    async def submit(self, job_type: str, payload: dict) -> str:
+        job_id = await run_io(self.store.submit, job_type, payload)
+        wakeup = self._wakeups.get(job_type)
+        if wakeup is not None:
+            wakeup.set()
+        return job_id
+
+    async def start(self) -> None:
+        requeued = await run_io(self.store.recover)
+        pruned = await run_io(self.store.prune)
+        if requeued or pruned:
+            print(f"Job queue: requeued {requeued} interrupted, pruned {pruned} old")
+        for job_type in self._handlers:
+            self._wakeups[job_type] = asyncio.Event()
+            self._running[job_type] = 0
+            for _ in range(self.concurrency.get(job_type, 1)):
+                self._tasks.append(asyncio.create_task(self._worker(job_type)))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await run_io(self.store.heartbeat)
+                requeued = await run_io(self.store.recover)
+            except Exception as e:
+                print(f"Warning: Job heartbeat failed: {str(e)}")
+                continue
+            if requeued:
+                print(f"Job queue: requeued {requeued} jobs with an expired lease")
+                for wakeup in self._wakeups.values():
+                    wakeup.set()
+
+    async def _worker(self, job_type: str) -> None:
+        wakeup = self._wakeups[job_type]
+        while True:
+            if not bootstrap_status.is_available("vectorstore", "prompts"):
+                await asyncio.sleep(self.poll_interval)
+                continue
+            # Clear before claiming so a job submitted meanwhile still wakes us
+            wakeup.clear()
+            job = await run_io(self.store.claim, job_type)
+            if job is None:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        job_type = job["type"]
+        self._running[job_type] += 1
+        print(f"Running {job_type} job {job['id']} (attempt {job['attempts']})")
+        try:
+            result = await self._handlers[job_type](job["payload"])
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # Shutdown: shield the write so the job is not left running
+                await asyncio.shield(run_io(self.store.release, job["id"]))
+                raise
+            # Cancelled from inside the handler, not by stop(): the worker
+            # carries on with the next job
+            print(f"Job {job['id']} failed: handler was cancelled")
+            await run_io(
+                self.store.finish,
+                job["id"],
+                error={"status": 500, "detail": "Job was cancelled"},
+            )
+        except Exception as e:
+            error = {
+                "status": getattr(e, "status_code", 500),
+                "detail": getattr(e, "detail", str(e)),
+            }
+            print(f"Job {job['id']} failed: {error['detail']}")
+            await run_io(self.store.finish, job["id"], error=error)
+        else:
+            await run_io(self.store.finish, job["id"], result=result)
+        finally:
+            self._running[job_type] -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "concurrency": {t: self.concurrency.get(t, 1) for t in self._handlers},
+            "running": dict(self._running),
+            "jobs": self.store.counts(),
+        }
+
+
+job_runner = JobRunner(JobStore())
+
+
+async def submit_job(job_type: str, payload: dict) -> JobAccepted:
+    """Queue a job and describe where to poll for it."""
+    job_id = await job_runner.submit(job_type, payload)
+    print(f"Queued {job_type} job {job_id}")
+    return JobAccepted(job_id=job_id, status="queued", status_url=f"/jobs/{job_id}")
@@ -0,0 +1,65 @@
+import json
+
+
+class QuestionStreamParser:
+    """Incrementally extracts question objects from a streamed evaluation.
+
+    Feed it the completion text as it arrives; each call returns the
+    objects of the top-level "questions" array whose closing brace was seen
+    in that chunk, so they can be forwarded before the rest of the JSON is
+    generated. Only string state and nesting depth are tracked, so each
+    character is inspected once.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_chars = []
+        self._last_key = None
+        self._in_questions = False
+        self._capturing = False
+        self._buffer = []
+
+    def feed(self, text: str) -> list[dict]:
+        complete = []
+        for ch in text:
+            if self._capturing:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = "".join(self._key_chars)
+                elif self._depth == 1:
+                    self._key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._key_chars = []
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_key == "questions":
+                    self._in_questions = True
+                elif ch == "{" and self._depth == 3 and self._in_questions:
+                    self._capturing = True
+                    self._buffer = ["{"]
+            elif ch in "}]":
+                if ch == "}" and self._depth == 3 and self._capturing:
+                    self._capturing = False
+                    try:
+                        question = json.loads("".join(self._buffer))
+                    except json.JSONDecodeError:
+                        question = None
+                    if isinstance(question, dict):
+                        complete.append(question)
+                elif ch == "]" and self._depth == 2:
+                    self._in_questions = False
+                self._depth -= 1
+        return complete
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import numpy as np
+import tiktoken
+from fastapi import HTTPException
+from openai import RateLimitError, APIConnectionError, APITimeoutError
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
+from config import (
+    EMBEDDING_CHUNK_TOKENS,
+    EMBEDDING_CHUNK_OVERLAP,
+    PROMPT_TOKEN_BUDGET,
+    CONDENSE_CHUNK_TOKENS,
+    CONDENSE_CONCURRENCY,
+    CONDENSE_MODEL,
+)
+from executors import run_cpu
+from utils import get_async_openai, get_embeddings
+
+# cl100k_base is the tokenizer of both the embedding model and GPT-4
+_encoding = None
+_encoding_lock = threading.Lock()
+
+# Condensation rounds before falling back to truncation
+MAX_CONDENSE_ROUNDS = 3
+
+
+def get_encoding() -> tiktoken.Encoding:
+    """Load the tokenizer once; the first call may download its BPE file."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def split_tokens(text: str, max_tokens: int, overlap: int = 0) -> list[str]:
+    """Split text into windows of at most `max_tokens` tokens."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return [text]
+    step = max(max_tokens - overlap, 1)
+    return [
+        encoding.decode(tokens[start : start + max_tokens])
+        for start in range(0, len(tokens) - overlap, step)
+    ]
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def split_for_embedding(texts: list[str]) -> list[list[str]]:
+    return [
+        split_tokens(text, EMBEDDING_CHUNK_TOKENS, EMBEDDING_CHUNK_OVERLAP)
+        for text in texts
+    ]
+
+
+async def embed_long_texts(texts: list[str]) -> list[list[float]]:
+    """Embed texts of any length with a single batched embedding request.
+
+    Text that fits one chunk is embedded as is. Longer text is split into
+    overlapping chunks whose embeddings are mean-pooled, weighted by chunk
+    length, into a unit-length vector.
+    """
+    try:
+        chunked = await run_cpu(split_for_embedding, texts)
+        vectors = await get_embeddings(
+            [chunk for chunks in chunked for chunk in chunks]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to generate embedding: {str(e)}"
+        )
+
+    pooled = []
+    offset = 0
+    for chunks in chunked:
+        chunk_vectors = vectors[offset : offset + len(chunks)]
+        offset += len(chunks)
+        if len(chunks) == 1:
+            pooled.append(chunk_vectors[0])
+            continue
+        print(f"Embedded long text as {len(chunks)} chunks")
+        weights = np.asarray([len(chunk) for chunk in chunks], dtype=np.float32)
+        mean = np.average(
+            np.asarray(chunk_vectors, dtype=np.float32), axis=0, weights=weights
+        )
+        pooled.append((mean / max(np.linalg.norm(mean), 1e-12)).tolist())
+    return pooled
+
+
+async def embed_long_text(text: str) -> list[float]:
+    """Embed one text of any length, see `embed_long_texts`."""
+    return (await embed_long_texts([text]))[0]
+
+
+@retry(
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError)
+    ),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=2, max=30),
+    reraise=True,
+)
+async def condense_chunk(chunk: str, target_tokens: int) -> str:
+    """Condense one section of a submission, keeping what an evaluator needs."""
+    response = await get_async_openai().chat.completions.create(
+        model=CONDENSE_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You condense sections of influencer content for brand review.",
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Condense this section to at most {target_tokens} tokens. "
+                    "Keep brand and product mentions, claims, calls to action, "
+                    "tone and any notable quotes verbatim. "
+                    "Respond with only the condensed text.\n\n"
+                    f"{chunk}"
+                ),
+            },
+        ],
+        temperature=0.2,
+        max_tokens=target_tokens,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def fit_prompt_budget(text: str, budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Return text that fits `budget` tokens, condensing it map-reduce style.
+
+    Each round splits the text into sections, condenses them in parallel
+    (at most CONDENSE_CONCURRENCY at a time) and joins the results in order.
+    Text still over budget after MAX_CONDENSE_ROUNDS is truncated.
+    """
+    semaphore = asyncio.Semaphore(CONDENSE_CONCURRENCY)
+
+    async def condense(chunk: str, target_tokens: int) -> str:
+        async with semaphore:
+            return await condense_chunk(chunk, target_tokens)
+
+    for round_number in range(1, MAX_CONDENSE_ROUNDS + 1):
+        if await run_cpu(count_tokens, text) <= budget:
+            return text
+        chunks = await run_cpu(split_tokens, text, CONDENSE_CHUNK_TOKENS)
+        target_tokens = max(budget // len(chunks), 200)
+        print(
+            f"Condensing {len(chunks)} sections to ~{target_tokens} tokens each "
+            f"(round {round_number})"
+        )
+        try:
+            condensed = await asyncio.gather(
+                *(condense(chunk, target_tokens) for chunk in chunks)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to condense submission: {str(e)}"
+            )
+        text = "\n\n".join(condensed)
+
+    return await run_cpu(truncate_tokens, text, budget)
@@ -1,23 +1,103 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api import evaluate_text, evaluate_video, evaluate_image
-from config import print_config_status, DATA_DIR, BRIEF_PROMPT_PATH
-from utils import setup_evaluation_system
+from fastapi.responses import JSONResponse
+import time
+
+# Measure cold start from the first import to the app accepting requests
+IMPORT_STARTED_AT = time.perf_counter()
+
+from api import evaluate_text, evaluate_video, jobs, submissions
+from bootstrap import run_bootstrap
+from config import (
+    print_config_status,
+    DATA_DIR,
+    BRIEF_PROMPT_PATH,
+    ENABLE_IMAGE_ROUTE,
+    CLIP_WARMUP,
+)
+from models import clip_status, process_memory_mb, warm_up_clip
+from readiness import bootstrap_status, RETRY_AFTER_SECONDS
+from submission_writer import submission_writer
+from executors import shutdown_executors
+from embedding_cache import embedding_cache
+from result_cache import result_cache
+from transcript_store import transcript_store
+from payload_store import payload_store
+from brief_index import brief_index, clip_brief_index
+from question_selector import question_selector
+from jobs import job_runner
+from utils import index_health, monitor_index_health
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
-from pathlib import Path
 
-# Print configuration status on startup
-print_config_status()
+if ENABLE_IMAGE_ROUTE:
+    from api import evaluate_image
+    from browser_pool import browser_pool
+    from screenshot_cache import screenshot_cache
+    from clip_batcher import clip_batcher
+
+startup_metrics = {"startup_seconds": None, "startup_memory": None}
+
+
+async def start_browser_pool() -> None:
+    """Launch the shared screenshot browser without delaying startup."""
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # The pool retries the launch on the first screenshot
+        print(f"Warning: Failed to launch Chromium: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Print configuration status on startup
+    print_config_status()
+
+    # Pick up artifacts from previous runs so requests can be served right away
+    bootstrap_status.refresh_availability()
+
+    # Bootstrap runs in the background so the server accepts connections immediately
+    app.state.bootstrap_task = asyncio.create_task(run_bootstrap())
+    app.state.index_health_task = asyncio.create_task(monitor_index_health())
+    submission_writer.start()
+    await job_runner.start()
+
+    if ENABLE_IMAGE_ROUTE:
+        app.state.browser_task = asyncio.create_task(start_browser_pool())
+
+    if ENABLE_IMAGE_ROUTE and CLIP_WARMUP:
+        app.state.clip_warmup_task = asyncio.create_task(
+            asyncio.to_thread(warm_up_clip)
+        )
+
+    startup_metrics["startup_seconds"] = round(
+        time.perf_counter() - IMPORT_STARTED_AT, 2
+    )
+    startup_metrics["startup_memory"] = process_memory_mb()
+    print(
+        f"Startup took {startup_metrics['startup_seconds']}s, "
+        f"RSS {startup_metrics['startup_memory']['rss_mb']} MB"
+    )
+    yield
+    # The worker thread cannot be interrupted; setup stages are safe to abandon
+    app.state.bootstrap_task.cancel()
+    app.state.index_health_task.cancel()
+    # Running jobs go back to the queue and resume on the next start
+    await job_runner.stop()
+    # Drain queued submission vectors before the process exits
+    await submission_writer.stop()
+    if ENABLE_IMAGE_ROUTE:
+        await browser_pool.stop()
+        await asyncio.to_thread(clip_batcher.stop)
+    shutdown_executors()
 
-# Initialize evaluation system before creating the app
-print("\nInitializing evaluation system...")
-setup_evaluation_system()
 
-# Create FastAPI app after initialization
 app = FastAPI(
     title="Influencer Submission Evaluator",
     description="API for evaluating influencer submissions against brand briefs",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS config — allow frontend (Next.js) to communicate with the backend
@@ -29,10 +109,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Register routes after initialization is complete
+# Routes return 503 with Retry-After until the artifacts they need are available
 app.include_router(evaluate_text.router, prefix="/text", tags=["Text Evaluation"])
-app.include_router(evaluate_image.router, prefix="/image", tags=["Image Evaluation"])
+if ENABLE_IMAGE_ROUTE:
+    app.include_router(
+        evaluate_image.router, prefix="/image", tags=["Image Evaluation"]
+    )
 app.include_router(evaluate_video.router, prefix="/video", tags=["Video Evaluation"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Evaluation Jobs"])
+app.include_router(
+    submissions.router, prefix="/submissions", tags=["Stored Submissions"]
+)
 
 
 @app.get("/")
@@ -40,6 +127,30 @@ def root():
     return {"status": "running", "version": "0.1.0"}
 
 
+@app.get("/health/live")
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness():
+    """Readiness probe: briefs are indexed and evaluation prompts exist."""
+    ready = bootstrap_status.is_available("vectorstore", "prompts")
+    body = {
+        "status": "ready" if ready else "initializing",
+        "stages": bootstrap_status.snapshot(),
+        "pinecone": index_health,
+    }
+    if ready:
+        return body
+    return JSONResponse(
+        status_code=503,
+        content=body,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
 @app.get("/test/init")
 def test_initialization():
     """Test endpoint to check initialization status."""
@@ -61,6 +172,28 @@ def test_initialization():
         "prompts": {
             "file_exists": BRIEF_PROMPT_PATH.exists(),
         },
+        "bootstrap": bootstrap_status.snapshot(),
+        "pinecone": index_health,
+        "submission_writer": submission_writer.snapshot(),
+        "embedding_cache": embedding_cache.snapshot(),
+        "result_cache": result_cache.snapshot(),
+        "transcript_store": transcript_store.snapshot(),
+        "payload_store": payload_store.snapshot(),
+        "brief_index": brief_index.snapshot(),
+        "clip_brief_index": clip_brief_index.snapshot(),
+        "question_selector": question_selector.snapshot(),
+        "jobs": job_runner.snapshot(),
+        "process": {
+            **startup_metrics,
+            "memory": process_memory_mb(),
+            "image_route_enabled": ENABLE_IMAGE_ROUTE,
+            "clip": clip_status(),
+            "browser_pool": browser_pool.snapshot() if ENABLE_IMAGE_ROUTE else None,
+            "clip_batcher": clip_batcher.snapshot() if ENABLE_IMAGE_ROUTE else None,
+            "screenshot_cache": (
+                screenshot_cache.snapshot() if ENABLE_IMAGE_ROUTE else None
+            ),
+        },
     }
 
     return {"status": "ok", "initialization_status": status}
@@ -0,0 +1,75 @@
+import resource
+import threading
+import time
+from config import CLIP_MODEL_NAME
+
+# CLIP is loaded on first use so workers that only serve /text and /video
+# never import torch/transformers or hold the model in memory.
+_clip_lock = threading.Lock()
+_clip = None
+_clip_stats = {
+    "state": "not_loaded",
+    "load_seconds": None,
+    "rss_before_mb": None,
+    "rss_after_mb": None,
+    "error": None,
+}
+
+
+def process_memory_mb() -> dict:
+    """Return current and peak resident set size of this process in MB."""
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        current_mb = round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except OSError:
+        current_mb = None
+    return {"rss_mb": current_mb, "peak_rss_mb": round(peak_mb, 1)}
+
+
+def get_clip():
+    """Return the shared (processor, model) pair, loading CLIP on first call."""
+    global _clip
+    if _clip is not None:
+        return _clip
+
+    with _clip_lock:
+        if _clip is not None:
+            return _clip
+
+        print(f"Loading CLIP model {CLIP_MODEL_NAME}...")
+        _clip_stats.update(state="loading", rss_before_mb=process_memory_mb()["rss_mb"])
+        started = time.perf_counter()
+        try:
+            from transformers import CLIPProcessor, CLIPModel
+
+            processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+            model = CLIPModel.from_pretrained(CLIP_MODEL_NAME)
+            model.eval()
+        except Exception as e:
+            _clip_stats.update(state="failed", error=str(e))
+            print(f"Error initializing CLIP model: {e}")
+            raise RuntimeError(f"Failed to initialize CLIP model: {e}")
+
+        _clip = (processor, model)
+        _clip_stats.update(
+            state="loaded",
+            load_seconds=round(time.perf_counter() - started, 2),
+            rss_after_mb=process_memory_mb()["rss_mb"],
+        )
+        print(f"CLIP model loaded in {_clip_stats['load_seconds']}s")
+        return _clip
+
+
+def warm_up_clip() -> None:
+    """Load CLIP ahead of the first image request, logging instead of raising."""
+    try:
+        get_clip()
+    except RuntimeError as e:
+        print(f"Warning: CLIP warm-up failed: {e}")
+
+
+def clip_status() -> dict:
+    """Report whether CLIP is loaded and what loading it cost."""
+    return dict(_clip_stats)
@@ -0,0 +1,148 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from config import PAYLOAD_STORE_PATH, PAYLOAD_RETENTION
+
+# Hashes per SELECT ... IN (...), below SQLite's limit on bound parameters
+# (999 before SQLite 3.32, 32766 since)
+_QUERY_CHUNK = 500
+
+
+class PayloadStore:
+    """Content-addressed store of submission bodies in SQLite.
+
+    Submission vectors carry only the SHA-256 of their text in Pinecone
+    metadata ("payload_hash"); the compressed text lives here. Identical
+    submissions share one row. Bodies that were neither stored again nor
+    looked up for `retention` seconds are deleted; their vectors then
+    resolve to no text.
+    """
+
+    def __init__(self, path=PAYLOAD_STORE_PATH, retention: float = PAYLOAD_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_evict = 0
+        self.stats = {
+            "stored": 0,
+            "deduplicated": 0,
+            "lookups": 0,
+            "missing": 0,
+            "evicted": 0,
+        }
+
+    @staticmethod
+    def make_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS payloads ("
+                "hash TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS payloads_last_used ON payloads(last_used)"
+            )
+        return self._conn
+
+    def put_many(self, texts: list[str]) -> list[str]:
+        """Store texts and return their hashes, in order."""
+        hashes = [self.make_hash(text) for text in texts]
+        rows = dict(zip(hashes, texts))
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            stored = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO payloads (hash, body, size, created_at, "
+                "last_used) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (digest, zlib.compress(text.encode("utf-8")), len(text), now, now)
+                    for digest, text in rows.items()
+                ],
+            )
+            stored = db.total_changes - stored
+            # Resubmitted bodies count as fresh again
+            db.executemany(
+                "UPDATE payloads SET last_used = ? WHERE hash = ?",
+                [(now, digest) for digest in rows],
+            )
+            db.commit()
+            self.stats["stored"] += stored
+            self.stats["deduplicated"] += len(texts) - stored
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._evict(db)
+        return hashes
+
+    def put(self, text: str) -> str:
+        return self.put_many([text])[0]
+
+    def get_many(self, hashes: list[str]) -> dict[str, str]:
+        """Map each known hash to its text, in one query per 500 hashes."""
+        unique = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(unique), _QUERY_CHUNK):
+                chunk = unique[start : start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                for digest, body in db.execute(
+                    f"SELECT hash, body FROM payloads WHERE hash IN ({placeholders})",
+                    chunk,
+                ):
+                    found[digest] = zlib.decompress(body).decode("utf-8")
+            if found:
+                now = time.time()
+                db.executemany(
+                    "UPDATE payloads SET last_used = ? WHERE hash = ?",
+                    [(now, digest) for digest in found],
+                )
+                db.commit()
+            self.stats["lookups"] += len(unique)
+            self.stats["missing"] += len(unique) - len(found)
+        return found
+
+    def resolve(self, metadatas: list[dict]) -> list[str | None]:
+        """Texts of submission vectors from their Pinecone metadata.
+
+        Vectors upserted before the payload store keep their text in
+        "chunk_text", which is returned as is.
+        """
+        texts = self.get_many(
+            [m["payload_hash"] for m in metadatas if "payload_hash" in m]
+        )
+        return [
+            texts.get(m["payload_hash"]) if "payload_hash" in m else m.get("chunk_text")
+            for m in metadatas
+        ]
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        self._puts_since_evict = 0
+        evicted = db.execute(
+            "DELETE FROM payloads WHERE last_used < ?", (time.time() - self.retention,)
+        ).rowcount
+        db.commit()
+        self.stats["evicted"] += evicted
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items, size = (
+                self._db()
+                .execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM payloads"
+                )
+                .fetchone()
+            )
+        return {**self.stats, "items": items, "bytes": size}
+
+
+payload_store = PayloadStore()
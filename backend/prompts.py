@@ -0,0 +1,240 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from fastapi import HTTPException
+from config import BRIEF_PROMPT_PATH, PROMPT_RELOAD_INTERVAL
+
+JSON_RESPONSE_FORMAT = (
+    "{\n"
+    '  "questions": [\n'
+    '    {"question": "...", "corrections": "...", "what_went_well": "..."},\n'
+    "    ...\n"
+    "  ],\n"
+    '  "summary": {\n'
+    '    "corrections": "...",\n'
+    '    "what_went_well": "...",\n'
+    '    "decision": "ACCEPT" or "REJECT"\n'
+    "  }\n"
+    "}\n\n"
+)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Everything needed to build the GPT-4 request for one submission type."""
+
+    question_types: tuple[str, ...]
+    system: str
+    instructions: str
+    submission_label: str
+    model: str
+
+
+TEMPLATES = {
+    "text": PromptTemplate(
+        question_types=("text", "general", "script"),
+        system="You are an AI that evaluates influencer content. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
+        instructions=(
+            "You are a brand evaluating influencer submissions.\n"
+            "You are given:\n"
+            "1. A campaign brief (summarized).\n"
+            "2. A submission from an influencer (text).\n"
+            "3. The most relevant evaluation questions.\n\n"
+            "The questions were selected as the most relevant for this submission.\n"
+            "Output a detailed answer for each of them.\n"
+            "For each question:\n"
+            "- Provide a short bullet point for 'corrections' (if any). If none, write 'No corrections needed'.\n"
+            "- Provide a short bullet point for 'what went well'.\n\n"
+            "At the end, include a final summary with:\n"
+            "- Top-level corrections.\n"
+            "- What the influencer did well.\n"
+            "- A decision: 'ACCEPT' or 'REJECT' (strictly one of these only).\n"
+            "Respond in this exact JSON format:\n" + JSON_RESPONSE_FORMAT
+        ),
+        submission_label="Submission",
+        model="gpt-4-turbo-preview",
+    ),
+    "image": PromptTemplate(
+        question_types=("image", "general"),
+        system="You are an AI that evaluates influencer image-based submissions. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
+        instructions=(
+            "You are a brand evaluating influencer image-based submissions.\n"
+            "Given:\n"
+            "1. A campaign brief\n"
+            "2. A submission (Milanote board screenshot)\n"
+            "3. The most relevant evaluation questions\n\n"
+            "The questions were selected as the most relevant for this submission; answer each of them.\n"
+            "For each question:\n"
+            "- Provide bullet points for 'corrections' (if any), or write 'No corrections needed'\n"
+            "- Provide bullet points for 'what went well'\n\n"
+            "At the end, include a final summary with:\n"
+            "- Top-level corrections\n"
+            "- What the influencer did well\n"
+            "- A decision: 'ACCEPT' or 'REJECT' (must be one)\n\n"
+            "Respond in this JSON format:\n" + JSON_RESPONSE_FORMAT
+        ),
+        submission_label="Submission URL",
+        model="gpt-4-turbo-preview",
+    ),
+    "video": PromptTemplate(
+        question_types=("video", "general"),
+        system="You are an AI that evaluates influencer content. You MUST respond with valid JSON in the exact format specified. Do not include any additional text or formatting outside of the JSON structure.",
+        instructions=(
+            "You are a brand evaluating influencer submissions.\n"
+            "You are given:\n"
+            "1. A campaign brief (summarized).\n"
+            "2. A submission from an influencer (a YouTube video transcript).\n"
+            "3. The most relevant evaluation questions.\n\n"
+            "The questions were selected as the most relevant for this submission.\n"
+            "Output a detailed answer for each of them.\n"
+            "For each question:\n"
+            "- Provide a short bullet point for 'corrections' (if any). If none, write 'No corrections needed'.\n"
+            "- Provide a short bullet point for 'what went well'.\n\n"
+            "At the end, include a final summary with:\n"
+            "- Top-level corrections.\n"
+            "- What the influencer did well.\n"
+            "- A decision: 'ACCEPT' or 'REJECT' (strictly one of these only).\n"
+            "Respond in this exact JSON format:\n" + JSON_RESPONSE_FORMAT
+        ),
+        submission_label="Submission",
+        model="gpt-4-turbo",
+    ),
+}
+
+
+def format_question_blocks(questions: list[dict]) -> str:
+    return "\n".join(
+        f"{i+1}. {q['question']}\n- Corrections:\n- What went well:"
+        for i, q in enumerate(questions)
+    )
+
+
+@dataclass(frozen=True)
+class PromptSet:
+    """An immutable, precompiled view of brief_prompt_questions.json."""
+
+    version: str
+    questions: tuple[dict, ...]
+    by_type: dict[str, tuple[dict, ...]] = field(default_factory=dict)
+    # Positions of each type's questions in `questions`, for embedding lookups
+    type_indices: dict[str, tuple[int, ...]] = field(default_factory=dict)
+
+    def questions_for(self, submission_type: str) -> tuple[dict, ...]:
+        questions = self.by_type.get(submission_type)
+        if not questions:
+            raise HTTPException(
+                status_code=500,
+                detail=f"No relevant prompts found for {submission_type} submission",
+            )
+        return questions
+
+    def render(
+        self, submission_type: str, brief: str, submission: str, questions: list[dict]
+    ) -> str:
+        """Build the user prompt for the selected questions."""
+        template = TEMPLATES[submission_type]
+        blocks = format_question_blocks(questions)
+        return (
+            template.instructions
+            + f"Brief:\n{brief}\n\n"
+            + f"{template.submission_label}:\n{submission}\n\n"
+            + f"Questions:\n{blocks}\n"
+        )
+
+
+def compile_prompt_set(raw: str) -> PromptSet:
+    """Parse the questions file and precompute per-type question lists."""
+    prompt_data = json.loads(raw)
+    prompts = (
+        prompt_data if isinstance(prompt_data, list) else prompt_data.get("prompts", [])
+    )
+    questions = tuple(p for p in prompts if isinstance(p, dict) and p.get("question"))
+    type_indices = {
+        submission_type: tuple(
+            i
+            for i, q in enumerate(questions)
+            if q.get("type") in template.question_types
+        )
+        for submission_type, template in TEMPLATES.items()
+    }
+    by_type = {
+        submission_type: tuple(questions[i] for i in indices)
+        for submission_type, indices in type_indices.items()
+    }
+    return PromptSet(
+        version=hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12],
+        questions=questions,
+        by_type=by_type,
+        type_indices=type_indices,
+    )
+
+
+class PromptRegistry:
+    """Process-wide prompt set, loaded once and hot-reloaded when the file changes.
+
+    The file's mtime is checked at most every `reload_interval` seconds; a
+    reload builds a new PromptSet and swaps it in atomically, so requests
+    never see a half-loaded set. A file that fails to parse keeps the
+    previous set in service.
+    """
+
+    def __init__(
+        self, path=BRIEF_PROMPT_PATH, reload_interval: float = PROMPT_RELOAD_INTERVAL
+    ):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._current = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._listeners = []
+
+    def on_reload(self, callback) -> None:
+        """Register `callback(prompt_set)` to run when a new version is loaded."""
+        self._listeners.append(callback)
+
+    def get(self) -> PromptSet:
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < self.reload_interval:
+            return self._current
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except FileNotFoundError:
+                if self._current is None:
+                    raise HTTPException(
+                        status_code=404, detail="Prompt questions file not found"
+                    )
+                return self._current
+
+            if mtime != self._mtime:
+                self._load(mtime)
+            return self._current
+
+    def _load(self, mtime: int) -> None:
+        try:
+            prompt_set = compile_prompt_set(self.path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError) as e:
+            if self._current is None:
+                raise HTTPException(
+                    status_code=500, detail="Failed to parse prompt questions file"
+                )
+            print(f"Warning: Keeping prompt set {self._current.version}: {str(e)}")
+            return
+
+        previous, self._current, self._mtime = self._current, prompt_set, mtime
+        if previous is None or previous.version != prompt_set.version:
+            print(
+                f"Loaded prompt set {prompt_set.version} "
+                f"({len(prompt_set.questions)} questions)"
+            )
+            if previous is not None:
+                for callback in self._listeners:
+                    callback(prompt_set)
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,96 @@
+import asyncio
+import numpy as np
+from config import QUESTION_TOP_N
+from brief_index import brief_index
+from prompts import PromptSet
+from utils import get_embeddings
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class QuestionSelector:
+    """Picks the evaluation questions most relevant to a submission.
+
+    Question texts are embedded once per prompt-set version into a
+    row-normalized matrix; each request then scores its type's questions
+    with one matrix-vector product against the brief and submission
+    embeddings and keeps the top `top_n`. If the questions cannot be
+    embedded, the first `top_n` questions are used as before.
+    """
+
+    def __init__(self, top_n: int = QUESTION_TOP_N):
+        self.top_n = top_n
+        self._version = None
+        self._matrix = None
+        self._lock = asyncio.Lock()
+        self.stats = {"selected": 0, "fallbacks": 0, "builds": 0}
+
+    async def matrix_for(self, prompt_set: PromptSet) -> np.ndarray:
+        """Question embedding matrix for `prompt_set`, built on first use."""
+        if self._version == prompt_set.version:
+            return self._matrix
+        async with self._lock:
+            if self._version != prompt_set.version:
+                vectors = await get_embeddings(
+                    [q["question"] for q in prompt_set.questions]
+                )
+                self._matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+                self._version = prompt_set.version
+                self.stats["builds"] += 1
+                print(
+                    f"Embedded {len(vectors)} evaluation questions "
+                    f"for prompt set {prompt_set.version}"
+                )
+            return self._matrix
+
+    async def _brief_vector(self, brief: dict) -> np.ndarray:
+        vector = brief_index.vector(brief["id"])
+        if vector is None:
+            # Pinecone fallback match; the brief text embedding is cached
+            (vector,) = await get_embeddings([brief["text"]])
+        return np.asarray(vector, dtype=np.float32)
+
+    async def select(
+        self,
+        prompt_set: PromptSet,
+        submission_type: str,
+        brief: dict,
+        submission_vector: list[float] | None = None,
+    ) -> list[dict]:
+        """Top questions for `submission_type` by similarity to brief and submission.
+
+        `submission_vector` must live in the question embedding space; pass
+        None for submissions embedded elsewhere (e.g. CLIP image vectors) to
+        rank by the brief alone.
+        """
+        questions = prompt_set.questions_for(submission_type)
+        if len(questions) <= self.top_n:
+            return list(questions)
+
+        try:
+            matrix = await self.matrix_for(prompt_set)
+            query = _normalize(await self._brief_vector(brief))
+            if submission_vector is not None:
+                query = query + _normalize(
+                    np.asarray(submission_vector, dtype=np.float32)
+                )
+        except Exception as e:
+            print(f"Warning: Question selection failed, using defaults: {str(e)}")
+            self.stats["fallbacks"] += 1
+            return list(questions[: self.top_n])
+
+        indices = np.asarray(prompt_set.type_indices[submission_type])
+        scores = matrix[indices] @ query
+        top = np.argsort(-scores, kind="stable")[: self.top_n]
+        self.stats["selected"] += 1
+        # Keep the file's question order so prompts stay stable across requests
+        return [questions[i] for i in sorted(top)]
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "top_n": self.top_n, "prompt_version": self._version}
+
+
+question_selector = QuestionSelector()
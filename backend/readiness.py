@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from fastapi import HTTPException
+from config import BRIEF_PROMPT_PATH, SUMMARIES_DIR, INGEST_MANIFEST_PATH
+
+# Seconds clients should wait before retrying while bootstrap is still running
+RETRY_AFTER_SECONDS = 5
+
+STAGES = ("summaries", "vectorstore", "prompts")
+
+
+class BootstrapStatus:
+    """Thread-safe record of evaluation system bootstrap progress.
+
+    A stage is "available" once its artifacts exist, either because this
+    process produced them or because they were left by a previous run.
+    Requests only need the artifacts, not a finished bootstrap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {
+            name: {
+                "state": "pending",
+                "available": False,
+                "done": 0,
+                "total": None,
+                "error": None,
+                "started_at": None,
+                "finished_at": None,
+            }
+            for name in STAGES
+        }
+
+    def refresh_availability(self) -> None:
+        """Mark stages whose artifacts already exist on disk as available."""
+        with self._lock:
+            self._stages["summaries"]["available"] = (
+                SUMMARIES_DIR / "briefs_summaries.txt"
+            ).exists()
+            self._stages["vectorstore"]["available"] = _manifest_has_indexed_briefs()
+            self._stages["prompts"]["available"] = BRIEF_PROMPT_PATH.exists()
+
+    def start(self, stage: str, total: int | None = None) -> None:
+        with self._lock:
+            self._stages[stage].update(
+                state="running",
+                done=0,
+                total=total,
+                error=None,
+                started_at=time.time(),
+                finished_at=None,
+            )
+
+    def progress(self, stage: str, done: int, total: int | None = None) -> None:
+        with self._lock:
+            self._stages[stage]["done"] = done
+            if total is not None:
+                self._stages[stage]["total"] = total
+
+    def finish(self, stage: str, state: str = "done") -> None:
+        with self._lock:
+            self._stages[stage].update(state=state, finished_at=time.time())
+            if state == "done":
+                self._stages[stage]["available"] = True
+
+    def fail(self, stage: str, error: str) -> None:
+        with self._lock:
+            self._stages[stage].update(
+                state="failed", error=error, finished_at=time.time()
+            )
+
+    def is_available(self, *stages: str) -> bool:
+        with self._lock:
+            return all(self._stages[stage]["available"] for stage in stages)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+
+def _manifest_has_indexed_briefs() -> bool:
+    """Check whether a previous run left indexed briefs in the vector store."""
+    if not INGEST_MANIFEST_PATH.exists():
+        return False
+    try:
+        manifest = json.loads(INGEST_MANIFEST_PATH.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return False
+    return any(e.get("indexed") for e in manifest.get("briefs", {}).values())
+
+
+bootstrap_status = BootstrapStatus()
+
+
+def require_ready(*stages: str):
+    """Build a route dependency that fails fast with 503 until `stages` are available."""
+
+    def dependency() -> None:
+        if not bootstrap_status.is_available(*stages):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Evaluation system is still initializing ({', '.join(stages)})",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+    return dependency
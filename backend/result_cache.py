@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import RESULT_CACHE_TTL, RESULT_CACHE_MAX_ITEMS
+
+
+def make_result_key(
+    submission_type: str,
+    content: str,
+    brief_id: str,
+    prompt_version: str,
+    model: str,
+) -> str:
+    """Key an evaluation by everything that can change its outcome."""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return f"{submission_type}:{content_hash}:{brief_id}:{prompt_version}:{model}"
+
+
+class ResultCache:
+    """TTL/LRU cache of evaluations with single-flight request coalescing.
+
+    Identical requests that arrive while an evaluation is still running
+    wait for that evaluation instead of starting their own LLM call. If it
+    is cancelled, one of them starts it again and the rest wait for that.
+    """
+
+    def __init__(
+        self, ttl: float = RESULT_CACHE_TTL, max_items: int = RESULT_CACHE_MAX_ITEMS
+    ):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "restarted": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self, reason: str = "") -> None:
+        """Drop all cached evaluations, e.g. after briefs or prompts change."""
+        with self._lock:
+            self._items.clear()
+            self.stats["invalidations"] += 1
+        print(f"Evaluation result cache cleared{f' ({reason})' if reason else ''}")
+
+    async def _join(self, key: str) -> dict | None:
+        """Wait for the in-flight computation of `key` and return its result.
+
+        Returns None if the request computing it was cancelled, e.g. because
+        its client disconnected; the caller then starts the computation
+        itself or joins whichever request did.
+        """
+        inflight = self._inflight[key]
+        self.stats["coalesced"] += 1
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled() or asyncio.current_task().cancelling():
+                raise
+            self.stats["restarted"] += 1
+            return None
+
+    async def get_or_compute(self, key: str, compute) -> dict:
+        """Return the cached result for `key`, joining or starting its computation."""
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached
+            if key not in self._inflight:
+                break
+            value = await self._join(key)
+            if value is not None:
+                return value
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case no other request was waiting
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def stream_or_compute(self, key: str, stream, replay):
+        """Streaming counterpart of `get_or_compute`.
+
+        `stream()` is an async generator of (event, data) pairs that ends with
+        ("result", value); its events are passed through and the result is
+        cached. Cached or in-flight results are replayed through `replay(value)`.
+        If the streaming client disconnects first, coalesced requests restart
+        the evaluation rather than fail with it.
+        """
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                for event in replay(cached):
+                    yield event
+                return
+            if key not in self._inflight:
+                break
+            value = await self._join(key)
+            if value is not None:
+                for event in replay(value):
+                    yield event
+                return
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        events = stream()
+        try:
+            async for event, data in events:
+                if event == "result":
+                    self.put(key, data)
+                    future.set_result(data)
+                yield event, data
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                future.exception()
+            raise
+        finally:
+            # Also covers a client disconnecting mid-stream: requests waiting
+            # on this evaluation see the cancellation and start it again
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+            await events.aclose()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "items": len(self._items),
+                "inflight": len(self._inflight),
+            }
+
+
+result_cache = ResultCache()
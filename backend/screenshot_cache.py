@@ -0,0 +1,126 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from config import (
+    SCREENSHOT_CACHE_PATH,
+    SCREENSHOT_CACHE_TTL,
+    SCREENSHOT_CACHE_MAX_BYTES,
+)
+
+
+class ScreenshotCache:
+    """Milanote board screenshots (JPEG) in SQLite, keyed by board URL.
+
+    Entries older than `ttl` seconds are recaptured. The store is trimmed
+    to `max_bytes` of image data, least recently used first.
+    """
+
+    def __init__(
+        self,
+        path=SCREENSHOT_CACHE_PATH,
+        ttl: float = SCREENSHOT_CACHE_TTL,
+        max_bytes: int = SCREENSHOT_CACHE_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evicted": 0}
+
+    @staticmethod
+    def make_key(board_url: str) -> str:
+        return hashlib.sha256(board_url.encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS screenshots ("
+                "key TEXT PRIMARY KEY, url TEXT NOT NULL, image BLOB NOT NULL, "
+                "format TEXT NOT NULL, digest TEXT NOT NULL, size INTEGER NOT NULL, "
+                "captured_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS screenshots_last_used "
+                "ON screenshots(last_used)"
+            )
+        return self._conn
+
+    def get(self, board_url: str) -> dict | None:
+        """Return a fresh cached screenshot as {"image", "format", "digest"}."""
+        key = self.make_key(board_url)
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT image, format, digest, captured_at FROM screenshots "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            image, image_format, digest, captured_at = row
+            if captured_at + self.ttl < time.time():
+                self.stats["expired"] += 1
+                return None
+            db.execute(
+                "UPDATE screenshots SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            db.commit()
+            self.stats["hits"] += 1
+        return {"image": image, "format": image_format, "digest": digest}
+
+    def put(self, board_url: str, image: bytes, image_format: str, digest: str) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO screenshots (key, url, image, format, digest, "
+                "size, captured_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.make_key(board_url),
+                    board_url,
+                    image,
+                    image_format,
+                    digest,
+                    len(image),
+                    now,
+                    now,
+                ),
+            )
+            db.commit()
+            self.stats["stores"] += 1
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        db.execute(
+            "DELETE FROM screenshots WHERE captured_at < ?", (time.time() - self.ttl,)
+        )
+        rows = db.execute(
+            "SELECT key, size FROM screenshots ORDER BY last_used DESC"
+        ).fetchall()
+        total, stale = 0, []
+        for key, size in rows:
+            total += size
+            if total > self.max_bytes:
+                stale.append((key,))
+        if stale:
+            db.executemany("DELETE FROM screenshots WHERE key = ?", stale)
+            self.stats["evicted"] += len(stale)
+        db.commit()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items, size = (
+                self._db()
+                .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM screenshots")
+                .fetchone()
+            )
+        return {**self.stats, "items": items, "bytes": size}
+
+
+screenshot_cache = ScreenshotCache()
@@ -0,0 +1,99 @@
+import json
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from result_cache import result_cache
+from utils import generate_evaluation, stream_evaluation
+
+# Evaluation pipelines are async generators of (event, data) pairs. Stage
+# events ("brief_matched", "questions_selected", ...) report progress,
+# "question" events carry one answered question each, and the final
+# ("result", evaluation) pair carries the validated evaluation. The regular
+# endpoints only keep the result; the /stream endpoints forward everything
+# as server-sent events.
+
+
+def replay_evaluation(evaluation: dict):
+    """Events for an evaluation that is already complete, e.g. from the cache."""
+    for index, question in enumerate(evaluation.get("questions", [])):
+        yield "question", {"index": index, **question}
+    yield "result", evaluation
+
+
+async def evaluation_events(cache_key: str, template, build_prompt, stream: bool):
+    """Final stage of every pipeline: the cached, single-flight GPT-4 call.
+
+    `build_prompt` is awaited only when the evaluation is not cached, so
+    expensive prompt preparation is skipped on cache hits.
+    """
+    if not stream:
+
+        async def compute() -> dict:
+            prompt = await build_prompt()
+            return await generate_evaluation(
+                template.system, prompt, model=template.model
+            )
+
+        yield "result", await result_cache.get_or_compute(cache_key, compute)
+        return
+
+    async def events():
+        prompt = await build_prompt()
+        async for event in stream_evaluation(
+            template.system, prompt, model=template.model
+        ):
+            yield event
+
+    async for event in result_cache.stream_or_compute(
+        cache_key, events, replay_evaluation
+    ):
+        yield event
+
+
+async def final_result(events) -> dict:
+    """Run a pipeline to completion and return its evaluation."""
+    try:
+        async for event, data in events:
+            if event == "result":
+                return data
+    finally:
+        await events.aclose()
+    raise HTTPException(status_code=500, detail="Evaluation produced no result")
+
+
+def format_sse(event: str, data: dict) -> str:
+    if event == "result":
+        data = {"evaluation": data}
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def sse_response(events) -> StreamingResponse:
+    """Stream a pipeline as server-sent events.
+
+    The pipeline is advanced to its first event before the response starts,
+    so validation and early failures still return a regular HTTP error.
+    Later failures are sent as an "error" event.
+    """
+    try:
+        first = await anext(events)
+    except BaseException:
+        await events.aclose()
+        raise
+
+    async def body():
+        try:
+            yield format_sse(*first)
+            async for event, data in events:
+                yield format_sse(event, data)
+        except HTTPException as e:
+            yield format_sse("error", {"status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            print(f"Error during streamed evaluation: {str(e)}")
+            yield format_sse("error", {"status": 500, "detail": str(e)})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
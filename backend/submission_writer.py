@@ -0,0 +1,134 @@
+import asyncio
+import threading
+from collections import defaultdict
+from config import SUBMISSION_BATCH_SIZE, SUBMISSION_FLUSH_INTERVAL
+from executors import run_io
+from utils import get_index
+
+
+class SubmissionWriter:
+    """Write-behind buffer that batches submission vectors per namespace.
+
+    Routers enqueue vectors and return immediately. A background task upserts
+    them in bulk once a namespace holds `max_batch` vectors or every
+    `flush_interval` seconds, retrying failed batches with backoff, and drains
+    whatever is left when the app shuts down. A vector can carry an
+    `on_upserted` callback, run in the I/O pool once its batch is written.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = SUBMISSION_BATCH_SIZE,
+        flush_interval: float = SUBMISSION_FLUSH_INTERVAL,
+        max_attempts: int = 3,
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._buffers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._loop = None
+        self._task = None
+        self.stats = {"queued": 0, "upserted": 0, "batches": 0, "failed": 0}
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and drain all buffered vectors."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def enqueue(self, namespace: str, vector: dict, on_upserted=None) -> None:
+        """Buffer a vector for upsert; never blocks on the network.
+
+        `on_upserted()` is called only after Pinecone accepted the vector,
+        never for vectors dropped after `max_attempts` failed upserts.
+        """
+        with self._lock:
+            self._buffers[namespace].append((vector, on_upserted))
+            self.stats["queued"] += 1
+            full = len(self._buffers[namespace]) >= self.max_batch
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self) -> dict:
+        with self._lock:
+            return {ns: len(vectors) for ns, vectors in self._buffers.items()}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Upsert everything buffered so far, one bulk request per batch."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, defaultdict(list)
+
+        batches = [
+            (namespace, vectors[i : i + self.max_batch])
+            for namespace, vectors in buffers.items()
+            for i in range(0, len(vectors), self.max_batch)
+        ]
+        for n, (namespace, batch) in enumerate(batches):
+            try:
+                await self._upsert_batch(namespace, batch)
+            except asyncio.CancelledError:
+                # Put unwritten batches back so the shutdown drain picks them up
+                with self._lock:
+                    for pending_ns, pending in reversed(batches[n:]):
+                        self._buffers[pending_ns][:0] = pending
+                raise
+
+    async def _upsert_batch(self, namespace: str, batch: list[tuple]) -> None:
+        vectors = [vector for vector, _ in batch]
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                index = await run_io(get_index)
+                await run_io(index.upsert, namespace=namespace, vectors=vectors)
+                self.stats["upserted"] += len(vectors)
+                self.stats["batches"] += 1
+                print(f"Upserted {len(vectors)} vectors to {namespace}")
+                callbacks = [callback for _, callback in batch if callback is not None]
+                if callbacks:
+                    await run_io(self._confirm, callbacks)
+                return
+            except Exception as e:
+                print(
+                    f"Warning: Upsert to {namespace} failed "
+                    f"(attempt {attempt}/{self.max_attempts}): {str(e)}"
+                )
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(2**attempt)
+
+        self.stats["failed"] += len(vectors)
+        print(f"Error: Dropped {len(vectors)} vectors for {namespace}")
+
+    @staticmethod
+    def _confirm(callbacks: list) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: Upsert callback failed: {str(e)}")
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "pending": self.pending()}
+
+
+submission_writer = SubmissionWriter()
@@ -0,0 +1,196 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from config import (
+    TRANSCRIPT_STORE_PATH,
+    TRANSCRIPT_TTL,
+    TRANSCRIPT_STORE_MAX_ITEMS,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSIONS,
+)
+
+
+class TranscriptStore:
+    """YouTube transcripts in SQLite, keyed by video id.
+
+    Each transcript is stored compressed with its content hash and, once
+    embedded and upserted, the embedding of that exact content.
+    A transcript is refetched after `ttl` seconds; if its hash is
+    unchanged the stored embedding stays valid, so the video is neither
+    re-embedded nor re-upserted.
+    """
+
+    def __init__(
+        self,
+        path=TRANSCRIPT_STORE_PATH,
+        ttl: float = TRANSCRIPT_TTL,
+        max_items: int = TRANSCRIPT_STORE_MAX_ITEMS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_items = max_items
+        self.model = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_evict = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "changed": 0,
+            "embeddings_reused": 0,
+            "evicted": 0,
+        }
+
+    @staticmethod
+    def hash_transcript(transcript: str) -> str:
+        return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "video_id TEXT PRIMARY KEY, transcript BLOB NOT NULL, "
+                "hash TEXT NOT NULL, embedding BLOB, embedding_model TEXT, "
+                "fetched_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS transcripts_last_used "
+                "ON transcripts(last_used)"
+            )
+        return self._conn
+
+    def _record(self, video_id: str, row) -> dict:
+        transcript, digest, embedding, model = row
+        if embedding is not None and model == self.model:
+            embedding = np.frombuffer(embedding, dtype=np.float32).tolist()
+        else:
+            embedding = None
+        return {
+            "video_id": video_id,
+            "transcript": zlib.decompress(transcript).decode("utf-8"),
+            "hash": digest,
+            "embedding": embedding,
+        }
+
+    def get(self, video_id: str) -> dict | None:
+        """Return the stored transcript record if it is younger than the TTL.
+
+        The record holds "video_id", "transcript", "hash" and "embedding"
+        (None until the current content has been embedded).
+        """
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT transcript, hash, embedding, embedding_model, fetched_at "
+                "FROM transcripts WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if row[4] + self.ttl < time.time():
+                self.stats["expired"] += 1
+                return None
+            db.execute(
+                "UPDATE transcripts SET last_used = ? WHERE video_id = ?",
+                (time.time(), video_id),
+            )
+            db.commit()
+            self.stats["hits"] += 1
+        return self._record(video_id, row[:4])
+
+    def put(self, video_id: str, transcript: str) -> dict:
+        """Store a freshly fetched transcript and return its record.
+
+        The stored embedding is kept if the content hash is unchanged.
+        """
+        digest = self.hash_transcript(transcript)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT hash FROM transcripts WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is not None and row[0] == digest:
+                db.execute(
+                    "UPDATE transcripts SET fetched_at = ?, last_used = ? "
+                    "WHERE video_id = ?",
+                    (now, now, video_id),
+                )
+            else:
+                if row is not None:
+                    self.stats["changed"] += 1
+                db.execute(
+                    "INSERT OR REPLACE INTO transcripts (video_id, transcript, hash, "
+                    "fetched_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        video_id,
+                        zlib.compress(transcript.encode("utf-8")),
+                        digest,
+                        now,
+                        now,
+                    ),
+                )
+            db.commit()
+            row = db.execute(
+                "SELECT transcript, hash, embedding, embedding_model "
+                "FROM transcripts WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._evict(db)
+        record = self._record(video_id, row)
+        if record["embedding"] is not None:
+            self.stats["embeddings_reused"] += 1
+        return record
+
+    def put_embeddings(self, items: list[tuple[str, str, list[float]]]) -> None:
+        """Attach embeddings as (video_id, hash, embedding) to stored transcripts.
+
+        An embedding is only stored if the transcript still has that hash.
+        """
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "UPDATE transcripts SET embedding = ?, embedding_model = ? "
+                "WHERE video_id = ? AND hash = ?",
+                [
+                    (
+                        np.asarray(embedding, dtype=np.float32).tobytes(),
+                        self.model,
+                        video_id,
+                        digest,
+                    )
+                    for video_id, digest, embedding in items
+                ],
+            )
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        self._puts_since_evict = 0
+        (count,) = db.execute("SELECT COUNT(*) FROM transcripts").fetchone()
+        excess = count - self.max_items
+        if excess > 0:
+            db.execute(
+                "DELETE FROM transcripts WHERE video_id IN "
+                "(SELECT video_id FROM transcripts ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            db.commit()
+            self.stats["evicted"] += excess
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            (items,) = self._db().execute("SELECT COUNT(*) FROM transcripts").fetchone()
+        return {**self.stats, "items": items}
+
+
+transcript_store = TranscriptStore()
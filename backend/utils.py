@@ -1,4 +1,10 @@
-from openai import OpenAI
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+)
 from pinecone import Pinecone, ServerlessSpec
 from config import (
     OPENAI_API_KEY,
@@ -7,13 +13,37 @@ from config import (
     PINECONE_INDEX_NAME,
     DATA_DIR,
     BRIEF_PROMPT_PATH,
+    BRIEFS_DIR,
+    SUMMARIES_DIR,
+    INGEST_MANIFEST_PATH,
+    SUMMARY_CONCURRENCY,
+    PINECONE_HEALTH_INTERVAL,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_REQUEST_MAX_ITEMS,
+    EMBEDDING_REQUEST_MAX_CHARS,
 )
 from fastapi import HTTPException
 import json
-from pathlib import Path
+import hashlib
 import asyncio
+import threading
+import time
 from typing import List, Dict
+from readiness import bootstrap_status
+from executors import run_io, run_cpu
+from embedding_cache import embedding_cache
+from brief_index import brief_index, clip_brief_index
+from result_cache import result_cache
+from prompts import prompt_registry
+from json_stream import QuestionStreamParser
 from tqdm import tqdm
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 
 def init_pinecone():
@@ -52,25 +82,140 @@ def init_pinecone():
         )
 
 
-def get_embedding(text: str) -> list[float]:
-    """Get OpenAI embedding for text."""
+# One Pinecone index handle per process, shared by all requests
+_index = None
+_index_lock = threading.Lock()
+index_health = {"status": "unknown", "checked_at": None, "stats": None, "error": None}
+
+
+def get_index():
+    """Return the process-wide Pinecone index handle, creating it on first use."""
+    global _index
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            _index = init_pinecone()
+            index_health.update(status="ok", checked_at=time.time(), error=None)
+        return _index
+
+
+def refresh_index_health() -> dict:
+    """Refresh the cached index stats; called in the background, not per request."""
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        return (
-            client.embeddings.create(input=[text], model="text-embedding-3-small")
-            .data[0]
-            .embedding
+        stats = get_index().describe_index_stats()
+        index_health.update(
+            status="ok",
+            checked_at=time.time(),
+            stats={
+                "total_vector_count": stats.total_vector_count,
+                "namespaces": {
+                    name: ns.vector_count for name, ns in stats.namespaces.items()
+                },
+            },
+            error=None,
         )
     except Exception as e:
+        index_health.update(status="error", checked_at=time.time(), error=str(e))
+        print(f"Warning: Pinecone health check failed: {str(e)}")
+    return index_health
+
+
+async def monitor_index_health(interval: float = PINECONE_HEALTH_INTERVAL) -> None:
+    """Periodically refresh the cached index health until cancelled."""
+    while True:
+        await run_io(refresh_index_health)
+        await asyncio.sleep(interval)
+
+
+_async_openai = None
+
+
+def get_async_openai() -> AsyncOpenAI:
+    """Return the process-wide async OpenAI client used by request handlers."""
+    global _async_openai
+    if _async_openai is None:
+        _async_openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _async_openai
+
+
+def split_embedding_requests(to_embed: dict[str, str]) -> list[list[str]]:
+    """Group keys into requests within the embeddings API input limits."""
+    requests, current, chars = [], [], 0
+    for key, text in to_embed.items():
+        if current and (
+            len(current) >= EMBEDDING_REQUEST_MAX_ITEMS
+            or chars + len(text) > EMBEDDING_REQUEST_MAX_CHARS
+        ):
+            requests.append(current)
+            current, chars = [], 0
+        current.append(key)
+        chars += len(text)
+    if current:
+        requests.append(current)
+    return requests
+
+
+async def get_embeddings(texts: list[str]) -> list[list[float]]:
+    """Get OpenAI embeddings for several texts, embedding only cache misses in one call."""
+    keys = [
+        embedding_cache.make_key(text, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+        for text in texts
+    ]
+    found = {}
+    for key in keys:
+        vector = embedding_cache.get_memory(key)
+        if vector is not None:
+            found[key] = vector
+    missing = list(dict.fromkeys(key for key in keys if key not in found))
+    if missing:
+        found.update(await run_io(embedding_cache.get_many, missing))
+
+    to_embed = {key: text for key, text in zip(keys, texts) if key not in found}
+    if to_embed:
+        # Usually a single request; only very large batches are split
+        requests = split_embedding_requests(to_embed)
+        responses = await asyncio.gather(
+            *(
+                get_async_openai().embeddings.create(
+                    input=[to_embed[key] for key in request_keys],
+                    model=EMBEDDING_MODEL,
+                    dimensions=EMBEDDING_DIMENSIONS,
+                )
+                for request_keys in requests
+            )
+        )
+        fresh = {
+            key: item.embedding
+            for request_keys, response in zip(requests, responses)
+            for key, item in zip(request_keys, response.data)
+        }
+        found.update(fresh)
+        await run_io(embedding_cache.put_many, fresh)
+
+    return [found[key] for key in keys]
+
+
+async def find_relevant_brief(submission_embedding: list[float]) -> dict:
+    """Find the most relevant brief, returning its id and text.
+
+    Matches against the local brief index and only queries Pinecone when the
+    local copy is missing or stale; only then is the index handle resolved.
+    """
+    local_matches = brief_index.search(submission_embedding, top_k=1)
+    if local_matches:
+        return local_matches[0]
+    if local_matches is not None:
+        # The local index is current and holds no briefs
         raise HTTPException(
-            status_code=500, detail=f"Failed to generate embedding: {str(e)}"
+            status_code=404, detail="No matching brief found for submission."
         )
 
-
-def get_relevant_brief(index, submission_embedding: list[float]) -> str:
-    """Query Pinecone to find the most relevant brief."""
     try:
-        query_response = index.query(
+        index = await run_io(get_index)
+        query_response = await run_io(
+            index.query,
             vector=submission_embedding,
             top_k=1,
             namespace="brief",
@@ -82,11 +227,164 @@ def get_relevant_brief(index, submission_embedding: list[float]) -> str:
                 status_code=404, detail="No matching brief found for submission."
             )
 
-        return query_response.matches[0].metadata.get("chunk_text", "")
+        match = query_response.matches[0]
+        return {"id": match.id, "text": match.metadata.get("chunk_text", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to query brief: {str(e)}")
 
 
+async def find_relevant_briefs(embeddings: list[list[float]]) -> list:
+    """Match many submissions at once.
+
+    Uses one vectorized pass over the local brief index; when it is stale,
+    falls back to concurrent Pinecone queries. Items whose match failed hold
+    the exception instead of a brief.
+    """
+    if not embeddings:
+        return []
+    local_matches = brief_index.search_batch(embeddings, top_k=1)
+    if local_matches is not None:
+        return [
+            (
+                matches[0]
+                if matches
+                else HTTPException(status_code=404, detail="No matching brief found")
+            )
+            for matches in local_matches
+        ]
+    return await asyncio.gather(
+        *(find_relevant_brief(embedding) for embedding in embeddings),
+        return_exceptions=True,
+    )
+
+
+async def find_image_brief(image_embedding: list[float]) -> dict:
+    """Find the brief closest to a CLIP image embedding.
+
+    Matches against the CLIP text-encoder brief index, building it first
+    if briefs changed since it was last synced.
+    """
+    if clip_brief_index.is_stale():
+        await run_cpu(ensure_clip_brief_index)
+    matches = clip_brief_index.search(image_embedding, top_k=1)
+    if not matches:
+        raise HTTPException(
+            status_code=404, detail="No matching brief found for submission."
+        )
+    return matches[0]
+
+
+# Cached evaluations are tied to the prompt set they were generated with
+prompt_registry.on_reload(lambda _: result_cache.clear("prompt questions changed"))
+
+
+def validate_evaluation(evaluation: dict) -> None:
+    """Check that a parsed GPT-4 evaluation has the structure the frontend expects."""
+    required_keys = {"questions", "summary"}
+    if not all(key in evaluation for key in required_keys):
+        raise ValueError("Response missing required keys: questions and/or summary")
+
+    if not isinstance(evaluation["questions"], list):
+        raise ValueError("'questions' must be a list")
+
+    if not isinstance(evaluation["summary"], dict):
+        raise ValueError("'summary' must be an object")
+
+    required_summary_keys = {"corrections", "what_went_well", "decision"}
+    if not all(key in evaluation["summary"] for key in required_summary_keys):
+        raise ValueError("Summary missing required keys")
+
+
+def parse_evaluation(raw_content: str) -> dict:
+    """Parse and validate the raw JSON content of a GPT-4 evaluation."""
+    if not raw_content or raw_content.isspace():
+        raise HTTPException(
+            status_code=500, detail="Received empty response from GPT-4"
+        )
+
+    try:
+        evaluation = json.loads(raw_content)
+        validate_evaluation(evaluation)
+    except json.JSONDecodeError as je:
+        print(f"JSON parse error at position {je.pos}: {je.msg}")
+        print(f"Content around error: {raw_content[max(0, je.pos-50):je.pos+50]}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to parse GPT-4 response as JSON. Error: {str(je)}",
+        )
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=500, detail=f"Invalid response structure: {str(ve)}"
+        )
+
+    print("Successfully validated JSON response structure")
+    return evaluation
+
+
+def evaluation_request(system_prompt: str, prompt: str, model: str) -> dict:
+    """Chat completion arguments shared by the blocking and streaming calls."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.2,  # Lower temperature for more consistent JSON formatting
+        "max_tokens": 2000,
+        "response_format": {"type": "json_object"},  # Enforce JSON response
+    }
+
+
+async def generate_evaluation(
+    system_prompt: str, prompt: str, model: str = "gpt-4-turbo-preview"
+) -> dict:
+    """Get an evaluation from GPT-4 and validate its JSON structure."""
+    response = await get_async_openai().chat.completions.create(
+        **evaluation_request(system_prompt, prompt, model)
+    )
+
+    # Debug: Print raw response content
+    raw_content = response.choices[0].message.content
+    print("Raw GPT-4 response:")
+    print(raw_content)
+    return parse_evaluation(raw_content)
+
+
+async def stream_evaluation(
+    system_prompt: str, prompt: str, model: str = "gpt-4-turbo-preview"
+):
+    """Stream an evaluation from GPT-4.
+
+    Yields ("question", {"index": i, ...}) as soon as each question object in
+    the completion is closed, then ("result", evaluation) once the whole
+    response has been parsed and validated.
+    """
+    stream = await get_async_openai().chat.completions.create(
+        **evaluation_request(system_prompt, prompt, model), stream=True
+    )
+    parser = QuestionStreamParser()
+    parts = []
+    emitted = 0
+    try:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            parts.append(delta)
+            for question in parser.feed(delta):
+                yield "question", {"index": emitted, **question}
+                emitted += 1
+    finally:
+        await stream.close()
+
+    raw_content = "".join(parts)
+    print("Raw GPT-4 response (streamed):")
+    print(raw_content)
+    yield "result", parse_evaluation(raw_content)
+
+
 def generate_prompts(client: OpenAI) -> None:
     """Generate evaluation prompts from briefs."""
     try:
@@ -155,9 +453,10 @@ Brief Summaries:
             final_prompts.extend(category_questions[:10])
 
         if final_prompts:
-            BRIEF_PROMPT_PATH.write_text(
-                json.dumps(final_prompts, indent=2), encoding="utf-8"
-            )
+            # Write atomically so the prompt registry never reads a partial file
+            tmp_path = BRIEF_PROMPT_PATH.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(final_prompts, indent=2), encoding="utf-8")
+            tmp_path.replace(BRIEF_PROMPT_PATH)
             print(f"Generated and saved {len(final_prompts)} evaluation prompts")
         else:
             print("No valid prompts were generated")
@@ -169,234 +468,400 @@ Brief Summaries:
         )
 
 
+@retry(
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError)
+    ),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=2, max=30),
+    reraise=True,
+)
+async def summarize_brief(client: AsyncOpenAI, brief: Dict[str, str]) -> str:
+    """Summarize a single brief, backing off on rate limits and transient errors."""
+    prompt = f"""
+    Summarize the following brand brief clearly and concisely so it can be embedded later for evaluation:
+    Brief:
+    {brief['text']}
+    Respond with only the summary, no title or explanation.
+    """
+    response = await client.chat.completions.create(
+        model="gpt-4-turbo-preview",
+        messages=[
+            {"role": "system", "content": "You summarize brand briefs."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.3,
+    )
+    summary = response.choices[0].message.content.strip()
+    return f"{brief['title']}: {summary}"
+
+
 async def process_brief_batch(
-    client: OpenAI, briefs: List[Dict[str, str]], batch_size: int = 5
+    client: AsyncOpenAI,
+    briefs: List[Dict[str, str]],
+    max_concurrency: int = SUMMARY_CONCURRENCY,
 ) -> List[Dict[str, str]]:
-    """Process a batch of briefs concurrently."""
-    summaries = []
-    total = len(briefs)
-    processed = 0
-
-    for i in range(0, len(briefs), batch_size):
-        batch = briefs[i : i + batch_size]
-        results = []
-
-        for brief in batch:
-            prompt = f"""
-            Summarize the following brand brief clearly and concisely so it can be embedded later for evaluation:
-            Brief:
-            {brief['text']}
-            Respond with only the summary, no title or explanation.
-            """
+    """Summarize briefs concurrently, with at most `max_concurrency` requests in flight.
+
+    Results are returned in the same order as `briefs`; briefs that fail to
+    summarize are left out so they are retried on the next run.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    progress = tqdm(total=len(briefs), desc="Summarizing briefs", unit="brief")
 
+    async def summarize(brief: Dict[str, str]) -> Dict[str, str] | None:
+        async with semaphore:
             try:
-                response = client.chat.completions.create(
-                    model="gpt-4-turbo-preview",
-                    messages=[
-                        {"role": "system", "content": "You summarize brand briefs."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.3,
-                )
-                summary = response.choices[0].message.content.strip()
-                full_summary = f"{brief['title']}: {summary}"
-                results.append({"file": brief["file"], "summary": full_summary})
-                processed += 1
-                print(f"Summarizing briefs: {(processed/total)*100:.0f}%", end="\r")
+                summary = await summarize_brief(client, brief)
             except Exception as e:
-                print(f"\nError summarizing {brief['file']}: {e}")
-                continue
-
-        summaries.extend(results)
+                progress.write(f"Error summarizing {brief['file']}: {e}")
+                return None
+            finally:
+                progress.update(1)
+                bootstrap_status.progress("summaries", progress.n, len(briefs))
+        progress.set_postfix_str(brief["file"])
+        return {"file": brief["file"], "summary": summary}
 
-    print("\nSummarization complete!")
-    return summaries
-
-
-async def summarize_briefs_async(client: OpenAI) -> None:
-    """Asynchronously summarize briefs and create embeddings."""
     try:
-        briefs_dir = DATA_DIR / "brief"
-        summaries_dir = DATA_DIR / "summaries"
-        summaries_dir.mkdir(parents=True, exist_ok=True)
-
-        # First, collect all briefs
-        briefs = []
-        for file_path in briefs_dir.glob("*.txt"):
-            brief_text = file_path.read_text(encoding="utf-8").strip()
-            lines = brief_text.strip().split("\n")[:5]
-            title = max((line.strip() for line in lines if line.strip()), key=len)
-            briefs.append({"file": file_path.name, "text": brief_text, "title": title})
-
-        if not briefs:
-            print("No briefs found to process.")
-            return
+        results = await asyncio.gather(*(summarize(brief) for brief in briefs))
+    finally:
+        progress.close()
 
-        print(f"Processing {len(briefs)} briefs...")
-        summaries = await process_brief_batch(client, briefs)
+    summaries = [r for r in results if r is not None]
+    print(f"Summarization complete! ({len(summaries)}/{len(briefs)} briefs)")
+    return summaries
 
-        if summaries:
-            # Save summaries
-            summaries_json = summaries_dir / "briefs_summaries.json"
-            summaries_txt = summaries_dir / "briefs_summaries.txt"
 
-            # Prepare flat summaries for text file
-            flat_summaries = [s["summary"] for s in summaries]
+async def summarize_briefs_async(briefs: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Summarize briefs with a short-lived async OpenAI client."""
+    async with AsyncOpenAI(api_key=OPENAI_API_KEY) as client:
+        return await process_brief_batch(client, briefs)
 
-            # Save files
-            summaries_json.write_text(json.dumps(summaries, indent=2), encoding="utf-8")
-            summaries_txt.write_text("\n\n".join(flat_summaries), encoding="utf-8")
-            print(f"Generated summaries for {len(summaries)} briefs")
-        else:
-            print("No briefs were summarized")
 
-    except Exception as e:
-        print(f"Warning: Failed to summarize briefs: {str(e)}")
+def hash_text(text: str) -> str:
+    """Return a stable content hash for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def summarize_briefs(client: OpenAI) -> None:
-    """Summarize briefs and create embeddings."""
+def load_ingest_manifest() -> dict:
+    """Load the brief ingestion manifest, or an empty one if none exists yet."""
+    if INGEST_MANIFEST_PATH.exists():
+        try:
+            return json.loads(INGEST_MANIFEST_PATH.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            print("Warning: Ingestion manifest is corrupt, rebuilding it.")
+    return {"version": 1, "briefs": {}}
+
+
+def manifest_revision(manifest: dict) -> str:
+    """Fingerprint of the indexed briefs, used to detect a stale local brief index."""
+    indexed = sorted(
+        f"{e['vector_id']}:{e['hash']}"
+        for e in manifest["briefs"].values()
+        if e.get("indexed")
+    )
+    return hash_text("\n".join(indexed))[:16]
+
+
+def save_ingest_manifest(manifest: dict) -> None:
+    """Atomically persist the ingestion manifest and the derived summary files."""
+    SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
+    manifest["revision"] = manifest_revision(manifest)
+    tmp_path = INGEST_MANIFEST_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp_path.replace(INGEST_MANIFEST_PATH)
+
+    # Keep the flat summary files in sync for prompt generation and /test/init
+    entries = [manifest["briefs"][key] for key in sorted(manifest["briefs"])]
+    summaries = [{"file": e["file"], "summary": e["summary"]} for e in entries]
+    (SUMMARIES_DIR / "briefs_summaries.json").write_text(
+        json.dumps(summaries, indent=2), encoding="utf-8"
+    )
+    (SUMMARIES_DIR / "briefs_summaries.txt").write_text(
+        "\n\n".join(s["summary"] for s in summaries), encoding="utf-8"
+    )
+
+
+def scan_briefs() -> Dict[str, Dict[str, str]]:
+    """Read all brief files, keyed by their file UUID."""
+    briefs = {}
+    for file_path in sorted(BRIEFS_DIR.glob("*.txt")):
+        brief_text = file_path.read_text(encoding="utf-8").strip()
+        lines = brief_text.strip().split("\n")[:5]
+        title = max((line.strip() for line in lines if line.strip()), key=len)
+        briefs[file_path.stem] = {
+            "file": file_path.name,
+            "text": brief_text,
+            "title": title,
+            "hash": hash_text(brief_text),
+        }
+    return briefs
+
+
+def load_legacy_summaries() -> Dict[str, str]:
+    """Load summaries written before the manifest existed, keyed by file name."""
+    summaries_json = SUMMARIES_DIR / "briefs_summaries.json"
+    if not summaries_json.exists():
+        return {}
     try:
-        briefs_dir = DATA_DIR / "brief"
-        summaries_dir = DATA_DIR / "summaries"
-        summaries_dir.mkdir(parents=True, exist_ok=True)
-
-        summaries = []
-        flat_summaries = []
-
-        for file_path in briefs_dir.glob("*.txt"):
-            brief_text = file_path.read_text(encoding="utf-8").strip()
-            title = extract_title(brief_text)
-
-            prompt = f"""
-            Summarize the following brand brief clearly and concisely so it can be embedded later for evaluation:
-            Brief:
-            {brief_text}
-            Respond with only the summary, no title or explanation.
-            """
-            print(f"Summarizing: {file_path.name}")
-
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4-turbo-preview",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You summarize brand briefs.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.3,
-                )
-                summary = response.choices[0].message.content.strip()
-                full_summary = f"{title}: {summary}"
-                summaries.append({"file": file_path.name, "summary": full_summary})
-                flat_summaries.append(full_summary)
-
-            except Exception as e:
-                print(f"Error summarizing {file_path.name}: {e}")
-                summaries.append(
-                    {"file": file_path.name, "summary": "", "error": str(e)}
-                )
-
-        # Save the summaries
-        summaries_json = summaries_dir / "briefs_summaries.json"
-        summaries_txt = summaries_dir / "briefs_summaries.txt"
-
-        summaries_json.write_text(json.dumps(summaries, indent=2), encoding="utf-8")
-        summaries_txt.write_text("\n\n".join(flat_summaries), encoding="utf-8")
-        print(f"Saved summaries to {summaries_json} and flat text to {summaries_txt}")
-
-    except Exception as e:
-        print(f"Warning: Failed to summarize briefs: {str(e)}")
-
-
-def extract_title(text: str) -> str:
-    """Extract a meaningful title from the first 5 lines of the brief."""
-    lines = text.strip().split("\n")[:5]
-    non_empty_lines = [line.strip() for line in lines if line.strip()]
-    # Select the line with the most words
-    if non_empty_lines:
-        return max(non_empty_lines, key=lambda line: len(line.split()))
-    return "untitled"
+        entries = json.loads(summaries_json.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+    return {e["file"]: e["summary"] for e in entries if e.get("summary")}
 
 
 def initialize_vectorstore(client: OpenAI) -> None:
-    """Initialize vector store with brief embeddings."""
+    """Incrementally sync brief summaries and embeddings with the vector store.
+
+    Only briefs that are new or whose content hash changed since the last run
+    are summarized and embedded; vectors of deleted briefs are removed. Vector
+    ids are derived from the brief file UUID so they stay stable across runs.
+    """
+    stage = "summaries"
     try:
-        summaries_file = DATA_DIR / "summaries/briefs_summaries.txt"
-        if not summaries_file.exists():
-            print("No brief summaries found. Skipping vector store initialization.")
+        manifest = load_ingest_manifest()
+        entries = manifest["briefs"]
+        briefs = scan_briefs()
+
+        to_summarize = [
+            {**brief, "uuid": key}
+            for key, brief in briefs.items()
+            if entries.get(key, {}).get("hash") != brief["hash"]
+        ]
+        deleted = [key for key in entries if key not in briefs]
+
+        # First run with a manifest: reuse summaries from the old flat files
+        # and drop the position-based ids (brief_1, brief_2, ...) they used.
+        is_migration = not entries and bool(briefs)
+        if is_migration:
+            legacy = load_legacy_summaries()
+            for brief in list(to_summarize):
+                if brief["file"] in legacy:
+                    entries[brief["uuid"]] = {
+                        "file": brief["file"],
+                        "hash": brief["hash"],
+                        "summary": legacy[brief["file"]],
+                        "vector_id": f"brief_{brief['uuid']}",
+                        "indexed": False,
+                    }
+                    to_summarize.remove(brief)
+
+        stage = "summaries"
+        bootstrap_status.start(stage, total=len(to_summarize))
+        if to_summarize:
+            print(f"Summarizing {len(to_summarize)} new or changed briefs...")
+            summaries = asyncio.run(summarize_briefs_async(to_summarize))
+            by_file = {s["file"]: s["summary"] for s in summaries}
+            for brief in to_summarize:
+                if brief["file"] not in by_file:
+                    continue
+                entries[brief["uuid"]] = {
+                    "file": brief["file"],
+                    "hash": brief["hash"],
+                    "summary": by_file[brief["file"]],
+                    "vector_id": f"brief_{brief['uuid']}",
+                    "indexed": False,
+                }
+            save_ingest_manifest(manifest)
+        bootstrap_status.finish(stage)
+
+        stage = "vectorstore"
+        to_index = [key for key, e in entries.items() if not e.get("indexed")]
+        bootstrap_status.start(stage, total=len(to_index) + len(deleted))
+        if not to_index and not deleted:
+            if not (SUMMARIES_DIR / "briefs_summaries.txt").exists():
+                save_ingest_manifest(manifest)
+            if brief_index.is_stale():
+                sync_brief_index(manifest, {})
+            bootstrap_status.finish(stage)
+            print(f"Vector store is up to date ({len(entries)} briefs).")
             return
 
-        content = summaries_file.read_text(encoding="utf-8").strip().split("\n\n")
-        if not content:
-            print("No content found in summaries file.")
-            return
+        index = get_index()
+        fresh_vectors = {}
 
-        texts = []
-        ids = []
-        metadatas = []
+        if is_migration:
+            try:
+                index.delete(delete_all=True, namespace="brief")
+                print("Removed position-based brief vectors")
+            except Exception as e:
+                print(f"Warning: Failed to clear legacy brief vectors: {str(e)}")
 
-        for i, chunk in enumerate(content):
-            clean_text = chunk.strip()
-            texts.append(clean_text)
-            ids.append(f"brief_{i+1}")
-            metadatas.append(
+        if to_index:
+            texts = [entries[key]["summary"] for key in to_index]
+            response = client.embeddings.create(
+                input=texts, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS
+            )
+            vectors = [
                 {
-                    "source": "brief",
-                    "source_id": f"brief_{i+1}",
-                    "chunk_text": clean_text,
-                    "category": "brief",
-                    "length": len(clean_text.split()),
+                    "id": entries[key]["vector_id"],
+                    "values": item.embedding,
+                    "metadata": {
+                        "source": "brief",
+                        "source_id": entries[key]["vector_id"],
+                        "chunk_text": text,
+                        "category": "brief",
+                        "length": len(text.split()),
+                    },
                 }
+                for key, text, item in zip(to_index, texts, response.data)
+            ]
+            index.upsert(namespace="brief", vectors=vectors)
+            for key in to_index:
+                entries[key]["indexed"] = True
+            fresh_vectors = {v["id"]: v["values"] for v in vectors}
+            bootstrap_status.progress(stage, len(to_index))
+            print(f"Uploaded {len(vectors)} brief embeddings to Pinecone")
+
+        if deleted:
+            index.delete(
+                ids=[entries[key]["vector_id"] for key in deleted], namespace="brief"
             )
+            for key in deleted:
+                del entries[key]
+            print(f"Removed {len(deleted)} deleted brief embeddings from Pinecone")
 
-        # Get embeddings
-        response = client.embeddings.create(input=texts, model="text-embedding-3-small")
-        embeddings = [item.embedding for item in response.data]
-
-        # Initialize Pinecone and upsert vectors
-        index = init_pinecone()
-        vectors = [
-            {"id": ids[i], "values": embeddings[i], "metadata": metadatas[i]}
-            for i in range(len(texts))
-        ]
-
-        index.upsert(namespace="brief", vectors=vectors)
-        print(f"Uploaded {len(vectors)} brief embeddings to Pinecone")
+        save_ingest_manifest(manifest)
+        sync_brief_index(manifest, fresh_vectors)
+        # Cached evaluations may reference briefs that just changed
+        result_cache.clear("briefs changed")
+        bootstrap_status.finish(stage)
 
     except Exception as e:
+        bootstrap_status.fail(stage, str(e))
         print(f"Warning: Failed to initialize vector store: {str(e)}")
 
 
+def sync_brief_index(manifest: dict, fresh_vectors: dict[str, list[float]]) -> None:
+    """Rebuild the local brief index from the indexed briefs in the manifest.
+
+    Vectors come from this run's upsert, then from the existing local copy if
+    the brief content is unchanged, and are otherwise fetched from Pinecone.
+    """
+    indexed = [
+        manifest["briefs"][key]
+        for key in sorted(manifest["briefs"])
+        if manifest["briefs"][key].get("indexed")
+    ]
+    known = brief_index.vectors_by_id()
+    vectors = {}
+    for entry in indexed:
+        vector_id = entry["vector_id"]
+        if vector_id in fresh_vectors:
+            vectors[vector_id] = fresh_vectors[vector_id]
+        elif vector_id in known and known[vector_id][0] == entry["hash"]:
+            vectors[vector_id] = known[vector_id][1]
+
+    missing = [e["vector_id"] for e in indexed if e["vector_id"] not in vectors]
+    if missing:
+        print(
+            f"Fetching {len(missing)} brief vectors from Pinecone for the local index"
+        )
+        index = get_index()
+        for i in range(0, len(missing), 100):
+            response = index.fetch(ids=missing[i : i + 100], namespace="brief")
+            for vector_id, vector in response.vectors.items():
+                vectors[vector_id] = vector.values
+
+    entries = [e for e in indexed if e["vector_id"] in vectors]
+    brief_index.replace(
+        ids=[e["vector_id"] for e in entries],
+        texts=[e["summary"] for e in entries],
+        hashes=[e["hash"] for e in entries],
+        vectors=[vectors[e["vector_id"]] for e in entries],
+        revision=manifest_revision(manifest),
+    )
+    print(f"Local brief index holds {len(entries)} briefs")
+
+
+_clip_index_lock = threading.Lock()
+
+
+def sync_clip_brief_index(manifest: dict) -> None:
+    """Rebuild the CLIP brief index from the indexed briefs in the manifest.
+
+    Summaries whose content hash is unchanged keep their vector; the rest
+    are encoded with the CLIP text encoder. The index is local only, since
+    the Pinecone index is dimensioned for text embeddings.
+    """
+    # Imported on demand so text and video workers never load CLIP
+    from clip_encoder import encode_texts
+
+    indexed = [
+        manifest["briefs"][key]
+        for key in sorted(manifest["briefs"])
+        if manifest["briefs"][key].get("indexed")
+    ]
+    known = clip_brief_index.vectors_by_id()
+    vectors = {
+        e["vector_id"]: known[e["vector_id"]][1]
+        for e in indexed
+        if e["vector_id"] in known and known[e["vector_id"]][0] == e["hash"]
+    }
+    missing = [e for e in indexed if e["vector_id"] not in vectors]
+    if missing:
+        print(f"Encoding {len(missing)} brief summaries with the CLIP text encoder")
+        encoded = encode_texts([e["summary"] for e in missing])
+        vectors.update(zip((e["vector_id"] for e in missing), encoded))
+
+    clip_brief_index.replace(
+        ids=[e["vector_id"] for e in indexed],
+        texts=[e["summary"] for e in indexed],
+        hashes=[e["hash"] for e in indexed],
+        vectors=[vectors[e["vector_id"]] for e in indexed],
+        revision=manifest_revision(manifest),
+    )
+    print(f"CLIP brief index holds {len(indexed)} briefs")
+
+
+def ensure_clip_brief_index() -> None:
+    """Sync the CLIP brief index if it is behind the ingestion manifest."""
+    with _clip_index_lock:
+        if clip_brief_index.is_stale():
+            sync_clip_brief_index(load_ingest_manifest())
+
+
 def setup_evaluation_system() -> None:
-    """Set up the complete evaluation system on first run."""
+    """Set up the evaluation system, only re-processing briefs that changed.
+
+    Progress is reported per stage through `readiness.bootstrap_status`.
+    """
+    bootstrap_status.refresh_availability()
     try:
         client = OpenAI(api_key=OPENAI_API_KEY)
 
-        # Only proceed if we have briefs
-        briefs_dir = DATA_DIR / "brief"
-        if not briefs_dir.exists() or not any(briefs_dir.glob("*.txt")):
+        has_briefs = BRIEFS_DIR.exists() and any(BRIEFS_DIR.glob("*.txt"))
+        # Nothing to do without briefs, unless briefs indexed before were deleted
+        if not has_briefs and not load_ingest_manifest()["briefs"]:
             print(
                 "No briefs found in data/brief/. System will use existing data if available."
             )
+            for stage in ("summaries", "vectorstore", "prompts"):
+                bootstrap_status.finish(stage, state="skipped")
             return
 
-        # Check if we need to generate summaries
-        summaries_file = DATA_DIR / "summaries/briefs_summaries.txt"
-        if not summaries_file.exists():
-            print("Generating brief summaries...")
-            asyncio.run(summarize_briefs_async(client))
+        # Summarize and index new or changed briefs, and remove deleted ones
+        print("Syncing briefs with vector store...")
+        initialize_vectorstore(client)
+        if not has_briefs:
+            print("All briefs were removed; skipping prompt generation.")
+            bootstrap_status.finish("prompts", state="skipped")
+            return
 
         # Check if we need to generate prompts
+        bootstrap_status.start("prompts")
         if not BRIEF_PROMPT_PATH.exists():
             print("Generating evaluation prompts...")
-            generate_prompts(client)
-
-        # Initialize vector store with briefs
-        print("Initializing vector store...")
-        initialize_vectorstore(client)
+            try:
+                generate_prompts(client)
+                result_cache.clear("prompt questions regenerated")
+            except Exception as e:
+                bootstrap_status.fail("prompts", str(e))
+                raise
+        if BRIEF_PROMPT_PATH.exists():
+            bootstrap_status.finish("prompts")
+        else:
+            bootstrap_status.fail("prompts", "No valid prompts were generated")
 
         print("Evaluation system setup complete.")
 
@@ -0,0 +1,134 @@
+"""Measure evaluation throughput at increasing concurrency levels.
+
+Usage (with the backend running on localhost:8000):
+    python scripts/load_test.py --endpoint /text/ --requests 64
+    python scripts/load_test.py --endpoint /video/ --videos videos.txt
+
+By default every request is unique, so the evaluation pipeline is measured
+rather than the result cache: each text gets a per-request nonce and videos
+rotate through the --videos list (one URL per line). --mode cached replays
+the same few payloads to measure cache hits instead.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+SUBMISSIONS_DIR = Path(__file__).parent.parent / "data" / "submissions"
+
+
+def load_payloads(endpoint: str, videos: Path | None = None) -> list[dict]:
+    if endpoint.startswith("/text"):
+        texts = [p.read_text(encoding="utf-8") for p in SUBMISSIONS_DIR.glob("*.txt")]
+        return [{"text": t} for t in texts] or [{"text": "Sample script"}]
+    if endpoint.startswith("/video"):
+        urls = videos.read_text(encoding="utf-8").split() if videos else []
+        urls = urls or ["https://www.youtube.com/watch?v=dQw4w9WgXcQ"]
+        return [{"youtube_url": url} for url in urls]
+    raise ValueError(f"Unsupported endpoint: {endpoint}")
+
+
+def make_payload(payloads: list[dict], i: int, mode: str, nonce: str) -> dict:
+    """The payload of request `i`; unique mode tags texts so none is cached."""
+    payload = payloads[i % len(payloads)]
+    if mode == "unique" and "text" in payload:
+        return {"text": f"{payload['text']}\n\n[load test {nonce}-{i}]"}
+    return payload
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    payloads: list[dict],
+    n: int,
+    c: int,
+    mode: str,
+    offset: int,
+    nonce: str,
+) -> dict:
+    semaphore = asyncio.Semaphore(c)
+    latencies = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    endpoint, json=make_payload(payloads, offset + i, mode, nonce)
+                )
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": c,
+        "throughput": n / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "errors": errors,
+    }
+
+
+async def main(
+    base_url: str,
+    endpoint: str,
+    n: int,
+    levels: list[int],
+    mode: str,
+    videos: Path | None,
+) -> None:
+    payloads = load_payloads(endpoint, videos)
+    nonce = uuid.uuid4().hex[:8]
+    print(f"Mode: {mode}, {len(payloads)} distinct base payloads")
+    if mode == "unique" and endpoint.startswith("/video"):
+        repeats = n * len(levels) - len(payloads)
+        if repeats > 0:
+            print(
+                f"Warning: {repeats} requests repeat a video and will hit the "
+                "result cache; pass more URLs with --videos"
+            )
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        print(
+            f"{'concurrency':>11} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'errors':>7}"
+        )
+        for level, c in enumerate(levels):
+            # Levels continue the request numbering so no payload is reused
+            r = await run_level(
+                client, endpoint, payloads, n, c, mode, level * n, nonce
+            )
+            print(
+                f"{r['concurrency']:>11} {r['throughput']:>8.2f} "
+                f"{r['p50']:>8.2f} {r['p95']:>8.2f} {r['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/text/")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--levels", default="1,4,16,32")
+    parser.add_argument("--mode", choices=["unique", "cached"], default="unique")
+    parser.add_argument("--videos", type=Path, help="File of YouTube URLs")
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.base_url,
+            args.endpoint,
+            args.requests,
+            [int(c) for c in args.levels.split(",")],
+            args.mode,
+            args.videos,
+        )
+    )